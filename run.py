@@ -1,13 +1,15 @@
 import uvicorn
 import argparse
 import logging
-from server import create_app
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = create_app()
+# Image pool workers are spawned and re-import this module as __mp_main__; they need no app
+if __name__ != "__mp_main__":
+    from server.app import create_app
+    app = create_app()
 
 def main(debug=False):
     logger.info(f"Starting server in {'debug' if debug else 'production'} mode")
@@ -1,11 +1,60 @@
-from dspy import ChainOfThought
+import asyncio
+import logging
+import time
+import dspy
 from server.agents.blog.dspy_models import *
+from server.agents.blog.predictors import predictor_registry, lm_usage
+from server.agents.blog.chunking import chunked
+from server.utils.ai_cache import uses_signatures
+from server.utils.ai_executor import ai_executor
+from server.utils.ai_metrics import ai_metrics
+
+logger = logging.getLogger(__name__)
+
+async def stream_predictor(name, on_chunk, **inputs):
+    """Run a registered predictor with DSPy streaming.
+
+    ``on_chunk(field, text)`` is awaited for each output field (including the
+    chain-of-thought reasoning) as tokens arrive; list fields stream the text
+    of the list as the LM writes it. Returns the final output fields as a dict.
+    """
+    predictor = predictor_registry.get(name)
+    output_fields = predictor.predict.signature.output_fields
+    listeners = [dspy.streaming.StreamListener(signature_field_name=field) for field in output_fields]
+    program = dspy.streamify(predictor, stream_listeners=listeners)
+
+    prediction = None
+    started = time.perf_counter()
+    try:
+        async for item in program(**inputs):
+            if isinstance(item, dspy.streaming.StreamResponse):
+                await on_chunk(item.signature_field_name, item.chunk)
+            elif isinstance(item, dspy.Prediction):
+                prediction = item
+    except Exception:
+        ai_metrics.record(name, time.perf_counter() - started, error=True)
+        raise
+    ai_metrics.record(name, time.perf_counter() - started, lm_usage(prediction))
+    return {field: prediction[field] for field in output_fields if field != "reasoning"}
+
+def streamable(name):
+    """Give a tool a ``stream(on_chunk, **inputs)`` variant backed by predictor ``name``.
+
+    Only tools whose result dict is exactly the predictor's output fields can
+    be streamed this way.
+    """
+    def decorator(fn):
+        async def stream(on_chunk, **inputs):
+            return await stream_predictor(name, on_chunk, **inputs)
+        fn.stream = stream
+        return fn
+    return decorator
 
 # Tools for during the writing process
+@uses_signatures(IntroductionHook)
 def generate_introduction(blog_content, tone):
     """Craft engaging introductions that hook readers immediately."""
-    introduction_hook = ChainOfThought(IntroductionHook)
-    prediction = introduction_hook(blog_content=blog_content, tone=tone)
+    prediction = predictor_registry.predict("IntroductionHook", blog_content=blog_content, tone=tone)
     introduction = {
         "story_hook": prediction.story_hook,
         "question_hook": prediction.question_hook,
@@ -14,10 +63,10 @@ def generate_introduction(blog_content, tone):
     }
     return introduction
 
+@uses_signatures(ThoughtOrganizer)
 def organize_thoughts(raw_thoughts):
     """Organize unorganized thoughts into structured blog ideas with writing prompts."""
-    thought_organizer = ChainOfThought(ThoughtOrganizer)
-    prediction = thought_organizer(raw_thoughts=raw_thoughts)
+    prediction = predictor_registry.predict("ThoughtOrganizer", raw_thoughts=raw_thoughts)
     organized_thoughts = {
         "key_points": prediction.key_points,
         "structure": prediction.structure,
@@ -25,20 +74,21 @@ def organize_thoughts(raw_thoughts):
     }
     return organized_thoughts
 
+@uses_signatures(ContentExpander)
+@streamable("ContentExpander")
 def expand_blog_content(blog_content, tone):
     """Expand blog content into fully developed thoughts and paragraphs"""
-    content_expander = ChainOfThought(ContentExpander)
-    prediction = content_expander(blog_content=blog_content, tone=tone)
+    prediction = predictor_registry.predict("ContentExpander", blog_content=blog_content, tone=tone)
     expanded_content = {
         "expanded_content": prediction.expanded_content,
         "transition_suggestions": prediction.transition_suggestions,
     }
     return expanded_content
 
+@uses_signatures(ResearchAssistant)
 def generate_research_directions(blog_content):
     """Suggest research directions to strengthen blog content."""
-    research_assistant = ChainOfThought(ResearchAssistant)
-    prediction = research_assistant(blog_content=blog_content)
+    prediction = predictor_registry.predict("ResearchAssistant", blog_content=blog_content)
     research_directions = {
         "research_areas": prediction.research_areas,
         "statistics_needed": prediction.statistics_needed,
@@ -47,10 +97,11 @@ def generate_research_directions(blog_content):
     }
     return research_directions
 
+@uses_signatures(ConclusionGenerator)
+@streamable("ConclusionGenerator")
 def generate_conclusion(blog_content, tone):
     """Create compelling conclusions that summarize and drive action."""
-    conclusion_generator = ChainOfThought(ConclusionGenerator)
-    prediction = conclusion_generator(blog_content=blog_content, tone=tone)
+    prediction = predictor_registry.predict("ConclusionGenerator", blog_content=blog_content, tone=tone)
     conclusion = {
         "conclusion_paragraph": prediction.conclusion_paragraph,
         "key_takeaways": prediction.key_takeaways,
@@ -59,20 +110,20 @@ def generate_conclusion(blog_content, tone):
     return conclusion
 
 # Post writing tools
+@uses_signatures(SUMMARY_SIGNATURE)
 def summarize_blog(blog_content):
     """Summarizes blog content"""
-    summarize = ChainOfThought("blog_content -> summary")
-    return summarize(blog_content=blog_content).summary
+    return predictor_registry.predict("BlogSummary", blog_content=blog_content).summary
 
+@uses_signatures(TAGS_SIGNATURE)
 def create_blog_tags(blog_content):
     """Creates relevant tags for blog content."""
-    tags = ChainOfThought("blog_content -> tags: list[str]")
-    return tags(blog_content=blog_content).tags
+    return predictor_registry.predict("BlogTags", blog_content=blog_content).tags
 
+@uses_signatures(ContentEditor)
 def edit_blog_content(blog_content, tone):
     """Edits blog content and provides specific improvement suggestions."""
-    content_editor = ChainOfThought(ContentEditor)
-    prediction = content_editor(blog_content=blog_content, tone=tone)
+    prediction = predictor_registry.predict("ContentEditor", blog_content=blog_content, tone=tone)
     edited_content = {
         "content_feedback": prediction.content_feedback,
         "structure_suggestions": prediction.structure_suggestions,
@@ -80,48 +131,135 @@ def edit_blog_content(blog_content, tone):
     }
     return edited_content
 
+@uses_signatures(ToneAdjuster)
+@streamable("ToneAdjuster")
 def adjust_tone(blog_content, tone):
     """Adjusts the tone of content to match target tone"""
-    tone_adjuster = ChainOfThought(ToneAdjuster)
-    prediction = tone_adjuster(blog_content=blog_content, tone=tone)
+    prediction = predictor_registry.predict("ToneAdjuster", blog_content=blog_content, tone=tone)
     adjusted_content = {
         "adjusted_content": prediction.adjusted_content,
         "word_choice_suggestions": prediction.word_choice_suggestions,
     }
     return adjusted_content
 
+@uses_signatures(TitleGenerator)
 def generate_titles(blog_content, tone):
     """Generates engaging blog titles from content"""
-    title_generator = ChainOfThought(TitleGenerator)
-    prediction = title_generator(blog_content=blog_content, tone=tone)
+    prediction = predictor_registry.predict("TitleGenerator", blog_content=blog_content, tone=tone)
     titles = {
         "attention_grabbing_titles": prediction.attention_grabbing_titles,
         "seo_friendly_titles": prediction.seo_friendly_titles,
     }
     return titles
 
-def prepare_publishing_package(blog_content, tone):
-    """Creates a complete publishing package with titles, summary, and tags."""
-    # Get title options
-    titles = generate_titles(blog_content, tone)
-    
-    # Get summary
-    summary = summarize_blog(blog_content)
-    
-    # Get tags
-    tags = create_blog_tags(blog_content)
-    
-    publishing_package = {
-        "title_options": titles,
-        "blog_summary": summary,
-        "suggested_tags": tags,
-        "meta_description": summary[:160] if len(summary) > 160 else summary,  # SEO-friendly meta description
-    }
-    return publishing_package
-
+async def _run_step(fn, **inputs):
+    """Run one sub-prediction on the AI executor, returning (value, error, seconds)."""
+    started = time.perf_counter()
+    try:
+        value = await ai_executor.run(fn, **inputs)
+        return value, None, time.perf_counter() - started
+    except Exception as e:
+        logger.error(f"Publishing step {fn.__name__} failed: {str(e)}")
+        return None, e, time.perf_counter() - started
 
+@uses_signatures(TitleGenerator, SUMMARY_SIGNATURE, TAGS_SIGNATURE)
+async def prepare_publishing_package(blog_content, tone):
+    """Creates a complete publishing package with titles, summary, and tags.
 
+    The sub-predictions are independent, so they run concurrently. Steps that
+    fail are reported in ``failed_steps`` and the rest of the package is still
+    returned; ``timings`` holds the seconds spent on each step.
+    """
+    steps = {
+        "title_options": _run_step(generate_titles, blog_content=blog_content, tone=tone),
+        "blog_summary": _run_step(summarize_blog, blog_content=blog_content),
+        "suggested_tags": _run_step(create_blog_tags, blog_content=blog_content),
+    }
+    outcomes = dict(zip(steps, await asyncio.gather(*steps.values())))
 
+    errors = [error for _, error, _ in outcomes.values() if error is not None]
+    if len(errors) == len(outcomes):
+        raise errors[0]
 
+    summary = outcomes["blog_summary"][0]
+    publishing_package = {
+        "title_options": outcomes["title_options"][0],
+        "blog_summary": summary,
+        "suggested_tags": outcomes["suggested_tags"][0],
+        "meta_description": summary[:160] if summary else None,  # SEO-friendly meta description
+        "failed_steps": {
+            step: str(error) for step, (_, error, _) in outcomes.items() if error is not None
+        },
+        "timings": {step: round(elapsed, 3) for step, (_, _, elapsed) in outcomes.items()},
+    }
+    return publishing_package
 
+# Map-reduce variants for long drafts: run per section, then merge the lists
+edit_blog_content_chunked = chunked(edit_blog_content)
+expand_blog_content_chunked = chunked(expand_blog_content)
+generate_research_directions_chunked = chunked(generate_research_directions)
 
+# Tools callable by name (e.g. from batch requests): the ai_results key each one
+# saves under, and which request field feeds each of its arguments.
+AI_TOOLS = {
+    "organize_thoughts": {
+        "fn": organize_thoughts,
+        "result_key": "organizedThoughts",
+        "inputs": {"raw_thoughts": "blog_content"},
+    },
+    "edit_blog_content": {
+        "fn": edit_blog_content,
+        "result_key": "editedContent",
+        "inputs": {"blog_content": "blog_content", "tone": "tone"},
+    },
+    "generate_titles": {
+        "fn": generate_titles,
+        "result_key": "titles",
+        "inputs": {"blog_content": "blog_content", "tone": "tone"},
+    },
+    "expand_blog_content": {
+        "fn": expand_blog_content,
+        "result_key": "expandedPoints",
+        "inputs": {"blog_content": "blog_content", "tone": "tone"},
+    },
+    "generate_research_directions": {
+        "fn": generate_research_directions,
+        "result_key": "researchDirections",
+        "inputs": {"blog_content": "blog_content"},
+    },
+    "adjust_tone": {
+        "fn": adjust_tone,
+        "result_key": "adjustedTone",
+        "inputs": {"blog_content": "blog_content", "tone": "tone"},
+    },
+    "generate_conclusion": {
+        "fn": generate_conclusion,
+        "result_key": "conclusion",
+        "inputs": {"blog_content": "blog_content", "tone": "tone"},
+    },
+    "generate_introduction": {
+        "fn": generate_introduction,
+        "result_key": "introduction",
+        "inputs": {"blog_content": "blog_content", "tone": "tone"},
+    },
+    "prepare_publishing_package": {
+        "fn": prepare_publishing_package,
+        "result_key": "publishingPackage",
+        "inputs": {"blog_content": "blog_content", "tone": "tone"},
+    },
+    "edit_blog_content_chunked": {
+        "fn": edit_blog_content_chunked,
+        "result_key": "editedContent",
+        "inputs": {"blog_content": "blog_content", "tone": "tone"},
+    },
+    "expand_blog_content_chunked": {
+        "fn": expand_blog_content_chunked,
+        "result_key": "expandedPoints",
+        "inputs": {"blog_content": "blog_content", "tone": "tone"},
+    },
+    "generate_research_directions_chunked": {
+        "fn": generate_research_directions_chunked,
+        "result_key": "researchDirections",
+        "inputs": {"blog_content": "blog_content"},
+    },
+}
@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import os
+import re
+from server.utils.ai_helpers import run_ai_tool
+
+# Target size of one chunk, and how many chunks of one draft run at once
+CHUNK_CHARS = int(os.getenv("AI_CHUNK_CHARS", "4000"))
+CHUNK_PARALLELISM = int(os.getenv("AI_CHUNK_PARALLELISM", "4"))
+
+_HEADING = re.compile(r"^(#{1,6}\s|<h[1-6][\s>])", re.IGNORECASE)
+
+
+def split_paragraphs(content: str) -> list:
+    return [p.strip() for p in re.split(r"\n\s*\n", content) if p.strip()]
+
+
+def _is_boundary(paragraph: str) -> bool:
+    # Roughly one paragraph in four ends a chunk, chosen by content rather than
+    # position, so inserting or deleting text only shifts nearby chunk boundaries
+    return hashlib.sha256(paragraph.encode("utf-8")).digest()[0] % 4 == 0
+
+
+def split_sections(content: str, max_chars: int = CHUNK_CHARS) -> list:
+    """Split a draft into section-level chunks.
+
+    A heading always starts a new chunk and no chunk grows past ``max_chars``
+    (a single longer paragraph gets a chunk of its own rather than being cut
+    mid-thought). Chunks may also end early at content-defined boundaries, so
+    an edit leaves the other chunks, and their hashes, unchanged.
+    """
+    chunks = []
+    current = []
+    size = 0
+    for paragraph in split_paragraphs(content):
+        if current and (_HEADING.match(paragraph) or size + len(paragraph) > max_chars):
+            chunks.append("\n\n".join(current))
+            current = []
+            size = 0
+        current.append(paragraph)
+        size += len(paragraph) + 2
+        if size >= max_chars // 4 and _is_boundary(paragraph):
+            chunks.append("\n\n".join(current))
+            current = []
+            size = 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def section_hash(section: str) -> str:
+    normalized = " ".join(section.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def section_hashes(content: str, max_chars: int = CHUNK_CHARS) -> list:
+    """Hashes of the chunks ``split_sections`` produces for ``content``."""
+    return [section_hash(section) for section in split_sections(content, max_chars)]
+
+
+def merge_results(results: list) -> dict:
+    """Merge per-chunk tool results into one.
+
+    List fields are concatenated with duplicates dropped; text fields are
+    joined with blank lines.
+    """
+    merged = {}
+    for result in results:
+        for field, value in result.items():
+            if isinstance(value, list):
+                existing = merged.setdefault(field, [])
+                existing.extend(item for item in value if item not in existing)
+            elif isinstance(value, str):
+                merged[field] = f"{merged[field]}\n\n{value}" if merged.get(field) else value
+            else:
+                merged.setdefault(field, value)
+    return merged
+
+
+def chunked(fn):
+    """Build a map-reduce variant of a ``blog_content`` tool.
+
+    The draft is split with ``split_sections``, ``fn`` runs on up to
+    ``CHUNK_PARALLELISM`` chunks at a time, and the chunk results are combined
+    with ``merge_results``. Each chunk goes through the AI result cache, so
+    after an edit only the chunks whose text changed reach the LLM.
+    """
+    async def run(blog_content, **inputs):
+        sections = split_sections(blog_content, CHUNK_CHARS)
+        if len(sections) <= 1:
+            return await run_ai_tool(fn, blog_content=blog_content, **inputs)
+
+        semaphore = asyncio.Semaphore(CHUNK_PARALLELISM)
+
+        async def run_section(section):
+            async with semaphore:
+                return await run_ai_tool(fn, blog_content=section, **inputs)
+
+        results = await asyncio.gather(*(run_section(section) for section in sections))
+        return merge_results(results)
+
+    run.__name__ = f"{fn.__name__}_chunked"
+    run.__doc__ = fn.__doc__
+    run.signatures = getattr(fn, "signatures", ())
+    # Lets callers save a result with the hashes of the sections it was built from
+    run.sections_of = lambda inputs: section_hashes(inputs["blog_content"], CHUNK_CHARS)
+    return run
@@ -1,5 +1,9 @@
 from dspy import Signature, InputField, OutputField
 
+# Inline signatures for the post writing tools
+SUMMARY_SIGNATURE = "blog_content -> summary"
+TAGS_SIGNATURE = "blog_content -> tags: list[str]"
+
 class ToneAdjuster(Signature):
     """Adjust the tone of content to match your brand voice."""
 
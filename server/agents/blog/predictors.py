@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from dspy import ChainOfThought
+from server.agents.blog.dspy_models import *
+from server.utils.ai_metrics import ai_metrics
+
+logger = logging.getLogger(__name__)
+
+# Every predictor the blog agent uses, by name. The name is also the file name
+# (``<name>.json``) of its compiled program state on disk.
+SIGNATURES = {
+    "ToneAdjuster": ToneAdjuster,
+    "ThoughtOrganizer": ThoughtOrganizer,
+    "ContentEditor": ContentEditor,
+    "TitleGenerator": TitleGenerator,
+    "ContentExpander": ContentExpander,
+    "ResearchAssistant": ResearchAssistant,
+    "ConclusionGenerator": ConclusionGenerator,
+    "IntroductionHook": IntroductionHook,
+    "BlogSummary": SUMMARY_SIGNATURE,
+    "BlogTags": TAGS_SIGNATURE,
+}
+
+DEFAULT_PROGRAMS_DIR = os.path.join(os.path.dirname(__file__), "programs")
+
+
+def lm_usage(prediction) -> dict:
+    """Token usage per model for a prediction (empty unless DSPy usage tracking is on)."""
+    get_lm_usage = getattr(prediction, "get_lm_usage", None)
+    return (get_lm_usage() if get_lm_usage else None) or {}
+
+
+class PredictorRegistry:
+    """Builds each blog predictor once and shares it across requests.
+
+    If ``<programs_dir>/<version>/<name>.json`` exists, the compiled program
+    state saved by a DSPy optimizer (tuned instructions, trimmed demos) is
+    loaded into the predictor, so prompt changes ship as data files instead of
+    code changes.
+    """
+
+    def __init__(self, programs_dir: str, version: str):
+        self.programs_dir = programs_dir
+        self.version = version
+        self._predictors = {}
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            programs_dir=os.getenv("DSPY_PROGRAMS_DIR", DEFAULT_PROGRAMS_DIR),
+            version=os.getenv("DSPY_PROGRAMS_VERSION", "v1"),
+        )
+
+    def program_path(self, name: str) -> str:
+        return os.path.join(self.programs_dir, self.version, f"{name}.json")
+
+    def _build_one(self, name: str):
+        predictor = ChainOfThought(SIGNATURES[name])
+        path = self.program_path(name)
+        if os.path.exists(path):
+            predictor.load(path)
+            with open(path, "rb") as f:
+                self._loaded[name] = hashlib.sha256(f.read()).hexdigest()
+            logger.info("Loaded compiled program for %s from %s", name, path)
+        return predictor
+
+    def build(self):
+        """Build all predictors up front so requests never pay for it."""
+        with self._lock:
+            for name in SIGNATURES:
+                if name not in self._predictors:
+                    self._predictors[name] = self._build_one(name)
+        logger.info(
+            "Built %d predictors (%d compiled, programs version %s)",
+            len(self._predictors), len(self._loaded), self.version,
+        )
+
+    def get(self, name: str):
+        predictor = self._predictors.get(name)
+        if predictor is None:
+            with self._lock:
+                predictor = self._predictors.get(name)
+                if predictor is None:
+                    predictor = self._predictors[name] = self._build_one(name)
+        return predictor
+
+    def predict(self, name: str, **inputs):
+        """Call predictor ``name`` and record its latency, token usage and errors."""
+        predictor = self.get(name)
+        started = time.perf_counter()
+        try:
+            prediction = predictor(**inputs)
+        except Exception:
+            ai_metrics.record(name, time.perf_counter() - started, error=True)
+            raise
+        ai_metrics.record(name, time.perf_counter() - started, lm_usage(prediction))
+        return prediction
+
+    def save(self, name: str, program):
+        """Write an optimized program as the compiled state for ``name`` in the current version."""
+        path = self.program_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        program.save(path)
+        logger.info("Saved compiled program for %s to %s", name, path)
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the loaded program state, so cached results change with it."""
+        loaded = ",".join(f"{name}:{digest}" for name, digest in sorted(self._loaded.items()))
+        return hashlib.sha256(f"{self.version}|{loaded}".encode("utf-8")).hexdigest()[:16]
+
+
+predictor_registry = PredictorRegistry.from_env()
@@ -0,0 +1,108 @@
+import sys
+import logging
+import os
+import traceback
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+import socketio
+import dspy
+from server.services.SocketClient import socket_client
+from server.utils.mongo_client import MongoDbClient
+from server.utils.ai_executor import ai_executor
+from server.utils.ai_cache import ai_cache
+from server.utils.indexes import apply_indexes
+from server.agents.blog.predictors import predictor_registry
+from server.agents.blog.agent_blog import AI_TOOLS
+from server.services.ai_jobs import ai_job_queue
+from server.services.media_service import shutdown_image_pool
+from server.services.media_sweeper import media_sweeper
+from server.services.blog_service import ensure_tag_counts
+from server.routes.blog import router as blog_router
+from server.routes.projects import router as projects_router
+from server.routes.blog_ai_tools import router as blog_ai_router
+from server.routes.admin import router as admin_router
+from server.routes.media import router as media_router
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup
+    mongo_client = MongoDbClient('personal_page')
+    app.state.mongo_client = mongo_client
+    await apply_indexes(mongo_client.db)
+    await ai_cache.attach(mongo_client.db)
+    await ensure_tag_counts(mongo_client.get_blog_posts_collection())
+
+    # Build DSPy predictors once, loading any compiled programs from disk
+    predictor_registry.build()
+    ai_cache.namespace = predictor_registry.fingerprint
+    await ai_job_queue.start(mongo_client.db, AI_TOOLS)
+    media_sweeper.start(mongo_client.db)
+
+    # Setup Socket.IO event handlers after system_state_manager is initialized
+    # from app.socket_handlers.setup_socket_handlers import setup_socket_handlers
+    # setup_socket_handlers(socket_client, app)
+    # app.state.sio = socket_client
+    yield
+
+    # Shutdown
+    await ai_job_queue.stop()
+    await media_sweeper.stop()
+    ai_executor.shutdown()
+    shutdown_image_pool()
+
+async def error_handling_middleware(request: Request, call_next):
+    try:
+        return await call_next(request)
+    except Exception as e:
+        exc_type, exc_value, exc_traceback = sys.exc_info()
+        stack_trace = traceback.format_exception(exc_type, exc_value, exc_traceback)
+        
+        logger.error(f"Unhandled error: {str(e)}")
+        logger.error(f"Stack trace: {''.join(stack_trace)}")
+        
+        return JSONResponse(
+            status_code=500,
+            content={
+                "error": str(e),
+                "type": exc_type.__name__,
+                "stack_trace": stack_trace
+            }
+        )
+
+def create_app():
+    app = FastAPI(lifespan=lifespan)
+    socket_app = socketio.ASGIApp(socket_client, app)
+
+    # Initialize DSPy. AI_LM=fake swaps in an offline stand-in for load testing
+    lm_name = os.getenv("AI_LM", "openai/gpt-4o-mini")
+    if lm_name == "fake":
+        from server.utils.fake_lm import FakeLM
+        lm = FakeLM.from_env()
+    else:
+        os.getenv("OPENAI_API_KEY")
+        lm = dspy.LM(lm_name)
+    dspy.configure(lm=lm, track_usage=True)
+    app.middleware("http")(error_handling_middleware)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["https://mindofshaun.com", "http://localhost:6066"],
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "OPTIONS", "PUT", "DELETE", "PATCH"],
+        allow_headers=["Content-Type", "Accept", "dbName", "uid", 'Kb-ID'],
+        expose_headers=["X-Next-Cursor", "ETag", "X-Cache"],
+    )
+
+    app.include_router(blog_router)
+    app.include_router(projects_router)
+    app.include_router(blog_ai_router)
+    app.include_router(admin_router)
+    app.include_router(media_router)
+    return socket_app
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""Throughput and latency benchmark for the /api/blog/ai/* routes.
+
+Start the server against the offline LM so runs are free and repeatable:
+
+    AI_LM=fake FAKE_LM_LATENCY=lognormal:0.0,0.5 python run.py
+
+then drive it at increasing concurrency:
+
+    python -m server.benchmarks.ai_throughput --concurrency 1,4,16,64
+
+For every level it reports throughput, p50/p95/p99 latency, rejections
+(429/503) and errors. While the AI calls run, a probe repeatedly requests a
+cheap route; if its p95 climbs with AI load, something is blocking the event
+loop. ``--max-probe-p95`` turns that into a failing exit code.
+"""
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+TOOLS = {
+    "organize-thoughts": False,
+    "edit-content": True,
+    "generate-titles": True,
+    "expand-blog-content": True,
+    "generate-research-directions": False,
+    "adjust-tone": True,
+    "generate-conclusion": True,
+    "generate-introduction": True,
+    "prepare-publishing-package": True,
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def make_payload(tool, unique_content):
+    content = "A short draft about writing better blog posts."
+    if unique_content:
+        # Defeat the AI result cache so every request reaches the LM
+        content = f"{content} Draft {uuid.uuid4()}"
+    payload = {"blog_content": content}
+    if TOOLS[tool]:
+        payload["tone"] = "conversational"
+    return payload
+
+
+def run_level(base_url, tools, concurrency, total, unique_content, probe_path, timeout):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def one_request(_):
+        tool = random.choice(tools)
+        started = time.perf_counter()
+        try:
+            response = requests.post(
+                f"{base_url}/api/blog/ai/{tool}", json=make_payload(tool, unique_content), timeout=timeout
+            )
+            status = response.status_code
+        except requests.RequestException:
+            status = "error"
+        elapsed = time.perf_counter() - started
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(elapsed)
+
+    probe_latencies = []
+    stop_probe = threading.Event()
+
+    def probe():
+        while not stop_probe.is_set():
+            started = time.perf_counter()
+            try:
+                requests.get(f"{base_url}{probe_path}", timeout=timeout)
+                probe_latencies.append(time.perf_counter() - started)
+            except requests.RequestException:
+                pass
+            stop_probe.wait(0.1)
+
+    probe_thread = threading.Thread(target=probe, daemon=True)
+    probe_thread.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(total)))
+    wall = time.perf_counter() - started
+    stop_probe.set()
+    probe_thread.join()
+
+    return {
+        "concurrency": concurrency,
+        "ok": statuses.get(200, 0),
+        "rejected": statuses.get(429, 0) + statuses.get(503, 0),
+        "errors": sum(count for status, count in statuses.items() if status not in (200, 429, 503)),
+        "throughput": statuses.get(200, 0) / wall if wall else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "mean": statistics.fmean(latencies) if latencies else 0.0,
+        "probe_p95": percentile(probe_latencies, 95),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the API server")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=0, help="Requests per level (default: 8 x concurrency)")
+    parser.add_argument("--tools", default=",".join(TOOLS), help="Comma-separated AI tool routes to exercise")
+    parser.add_argument("--cached", action="store_true", help="Reuse the same content so the AI cache can hit")
+    parser.add_argument("--probe-path", default="/openapi.json", help="Cheap route used to detect event-loop stalls")
+    parser.add_argument("--max-probe-p95", type=float, default=None, help="Fail if the probe p95 (s) exceeds this")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args(argv)
+
+    tools = [t for t in args.tools.split(",") if t]
+    unknown = [t for t in tools if t not in TOOLS]
+    if unknown:
+        parser.error(f"Unknown tools: {', '.join(unknown)}")
+
+    print(f"{'conc':>5} {'ok':>6} {'rej':>5} {'err':>5} {'req/s':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'probe95':>8}")
+    failed = False
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        total = args.requests or concurrency * 8
+        r = run_level(args.url, tools, concurrency, total, not args.cached, args.probe_path, args.timeout)
+        print(
+            f"{r['concurrency']:>5} {r['ok']:>6} {r['rejected']:>5} {r['errors']:>5} {r['throughput']:>8.2f} "
+            f"{r['p50']:>7.3f} {r['p95']:>7.3f} {r['p99']:>7.3f} {r['probe_p95']:>8.3f}"
+        )
+        if args.max_probe_p95 is not None and r["probe_p95"] > args.max_probe_p95:
+            failed = True
+
+    if failed:
+        print(f"Probe p95 exceeded {args.max_probe_p95}s: the event loop is being blocked", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
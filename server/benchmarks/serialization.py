@@ -0,0 +1,99 @@
+"""Micro-benchmark of list response serialization, per item.
+
+Compares two ways of turning 100 Mongo documents into a JSON list body:
+
+* ``pydantic``: validation plus Pydantic's own JSON encoder
+  (``TypeAdapter.dump_json``), which untrusted data such as projects uses
+* ``trusted``: the trusted-document fast path (field shaping + orjson)
+
+Run it with:
+
+    python -m server.benchmarks.serialization --items 100 --repeat 50
+
+The trusted output is checked against the Pydantic path, so a faster path
+that changed the JSON fails instead of reporting a number.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+from bson import ObjectId
+from server.models.blog import BlogPostResponse, BlogPostSummary
+from server.utils.serialization import dump_trusted, dump_validated
+
+_WORDS = "draft readers story idea clarity voice structure example detail argument insight context".split()
+
+
+def _text(words: int) -> str:
+    return " ".join(random.choice(_WORDS) for _ in range(words))
+
+
+def make_posts(count: int) -> list:
+    now = datetime(2025, 1, 1, 12, 0, 0, 123000)
+    return [{
+        "_id": ObjectId(),
+        "title": _text(8),
+        "content": _text(600),
+        "excerpt": _text(40),
+        "author": "Shaun",
+        "tags": random.sample(_WORDS, 4),
+        "published": i % 3 != 0,
+        "featured_image": None,
+        "created_at": now - timedelta(days=i),
+        "updated_at": now,
+        "section_hashes": [f"{random.getrandbits(64):016x}" for _ in range(8)],
+        "ai_results": {
+            "title_options": [_text(8) for _ in range(5)],
+            "blog_summary": _text(80),
+            "suggested_tags": random.sample(_WORDS, 5),
+        },
+    } for i in range(count)]
+
+
+def measure(fn, repeat: int) -> float:
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100, help="Documents per list response")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per path (best is reported)")
+    args = parser.parse_args(argv)
+
+    cases = [
+        ("posts", List[BlogPostResponse], make_posts(args.items)),
+        ("posts?view=summary", List[BlogPostSummary], make_posts(args.items)),
+    ]
+
+    print(f"{'response':<20} {'path':<9} {'total ms':>9} {'us/item':>9} {'speedup':>8}")
+    failed = False
+    for name, response_type, docs in cases:
+        expected = json.loads(dump_validated(docs, response_type))
+        paths = [
+            ("pydantic", lambda: dump_validated(docs, response_type)),
+            ("trusted", lambda: dump_trusted(docs, response_type)),
+        ]
+        baseline = None
+        for path, fn in paths:
+            if json.loads(fn()) != expected:
+                print(f"{name:<20} {path:<9} output differs from the Pydantic path")
+                failed = True
+                continue
+            seconds = measure(fn, args.repeat)
+            baseline = baseline or seconds
+            print(f"{name:<20} {path:<9} {seconds * 1e3:>9.2f} {seconds / args.items * 1e6:>9.1f} "
+                  f"{baseline / seconds:>7.1f}x")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
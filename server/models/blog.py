@@ -1,5 +1,5 @@
 from typing import Optional, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from server.models.utils import PyObjectId
 
@@ -7,11 +7,19 @@ from server.models.utils import PyObjectId
 class BlogContentOnly(BaseModel):
     blog_content: str
     post_id: Optional[str] = None
+    socket_id: Optional[str] = None  # Socket.IO client to notify when a queued job finishes
 
 class BlogContentWithTone(BaseModel):
     blog_content: str
     tone: str
     post_id: Optional[str] = None
+    socket_id: Optional[str] = None  # Socket.IO client for streamed output and job notifications
+
+class BlogAiBatchRequest(BaseModel):
+    tools: List[str]  # Tool names, e.g. "edit_blog_content", "generate_titles"
+    blog_content: str
+    tone: Optional[str] = None
+    post_id: Optional[str] = None
 
 # Basic blog post models
 class BlogPostBase(BaseModel):
@@ -42,8 +50,36 @@ class BlogPostResponse(BlogPostBase):
     updated_at: datetime
     ai_results: Optional[dict] = {}
 
-    class Config:
-        allow_population_by_field_name = True
-        json_encoders = {
-            datetime: lambda v: v.isoformat(),
-        }
+    model_config = ConfigDict(populate_by_name=True)
+
+# Card fields for post listings, without content or AI results
+class BlogPostSummary(BaseModel):
+    id: PyObjectId = Field(..., alias="_id")
+    title: Optional[str] = None
+    excerpt: Optional[str] = None
+    author: Optional[str] = None
+    tags: Optional[List[str]] = None
+    published: Optional[bool] = None
+    featured_image: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(populate_by_name=True)
+
+class TagCount(BaseModel):
+    tag: str
+    count: int
+
+class BlogSearchResult(BaseModel):
+    id: PyObjectId = Field(..., alias="_id")
+    title: Optional[str] = None
+    excerpt: Optional[str] = None
+    author: Optional[str] = None
+    tags: Optional[List[str]] = None
+    published: Optional[bool] = None
+    featured_image: Optional[str] = None
+    created_at: datetime
+    score: float
+    snippet: Optional[str] = None  # HTML-escaped excerpt of the content with matches in <mark>
+
+    model_config = ConfigDict(populate_by_name=True)
@@ -1,13 +1,20 @@
-from typing import List
-from pydantic import BaseModel, Field
-from bson import ObjectId
+from typing import Dict, List
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from server.models.utils import PyObjectId
 
 # Define models for project images
+class ImageVariant(BaseModel):
+    path: str
+    format: str  # "webp" or "avif"
+    width: int
+    height: int
+    bytes: int
+
 class ProjectImage(BaseModel):
     image: str  # Path to the image
     description: str
+    variants: Dict[str, ImageVariant] = {}  # Responsive renditions keyed "<width>.<format>", e.g. "640.avif"
 
 # Define models for project details
 class ProjectDetails(BaseModel):
@@ -38,15 +45,28 @@ class ProjectResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        populate_by_name = True
-        json_encoders = {
-            ObjectId: str
-        }
+    model_config = ConfigDict(populate_by_name=True)
         
     @classmethod
     def from_mongo(cls, data):
         if not data:
             return data
             
-        return cls(**data)
\ No newline at end of file
+        return cls(**data)
+
+# Card view of a project for listings, without the code samples
+class ProjectCardDetails(BaseModel):
+    title: str
+    description: str
+    clientTech: List[str] = []
+    serverTech: List[str] = []
+    published: bool = False
+
+class ProjectCard(BaseModel):
+    id: PyObjectId = Field(alias="_id")
+    images: List[ProjectImage]
+    project_details: ProjectCardDetails
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(populate_by_name=True)
@@ -1,11 +1,18 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.responses import PlainTextResponse
 from datetime import timedelta
 from server.models.auth import (
     Admin, AdminCreate, Token, 
-    create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES,
+    create_access_token, get_current_admin, ACCESS_TOKEN_EXPIRE_MINUTES,
 )
 from passlib.context import CryptContext
+from server.utils.ai_executor import ai_executor
+from server.utils.ai_cache import ai_cache
+from server.utils.ai_metrics import ai_metrics
+from server.utils.response_cache import response_cache
+from server.services.media_renditions import rendition_cache
+from server.services.media_sweeper import media_sweeper
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -71,10 +78,10 @@ async def get_dashboard(request: Request):
     """
     db = request.app.state.mongo_client.db
     
-    # Get counts from each collection
-    services_count = await db.services.count_documents({})
-    projects_count = await db.projects.count_documents({})
-    testimonials_count = await db.testimonials.count_documents({})
+    # Get counts from each collection (from collection metadata, without scanning)
+    services_count = await db.services.estimated_document_count()
+    projects_count = await db.projects.estimated_document_count()
+    testimonials_count = await db.testimonials.estimated_document_count()
     
     # Get contact message information
     unread_messages_count = await db.contact_messages.count_documents({"is_read": False})
@@ -103,4 +110,74 @@ async def get_dashboard(request: Request):
         "recentMessages": formatted_messages
     }
     
-    return dashboard_data 
\ No newline at end of file
+    return dashboard_data 
+
+@router.get("/ai-executor", dependencies=[Depends(get_current_admin)])
+async def get_ai_executor_stats():
+    """
+    Report AI executor load: queue depth, running calls, rejections,
+    and average/max wait and run times.
+    """
+    return ai_executor.stats()
+
+
+@router.get("/ai-cache", dependencies=[Depends(get_current_admin)])
+async def get_ai_cache_stats():
+    """
+    Report AI result cache usage and per-tool hit/miss counts.
+    """
+    return ai_cache.stats()
+
+
+@router.get("/response-cache", dependencies=[Depends(get_current_admin)])
+async def get_response_cache_stats():
+    """
+    Report public GET response cache usage: entries, bytes, hits, misses, 304s and invalidations.
+    """
+    return response_cache.stats()
+
+
+@router.get("/media-renditions", dependencies=[Depends(get_current_admin)])
+async def get_media_rendition_stats():
+    """
+    Report on-demand image rendition cache usage, hits, misses and evictions.
+    """
+    return rendition_cache.stats()
+
+
+@router.get("/media/sweep", dependencies=[Depends(get_current_admin)])
+async def get_media_sweep_report():
+    """
+    Report the last orphaned media sweep: files scanned and removed, and bytes reclaimed.
+    """
+    return {
+        "grace_seconds": media_sweeper.grace_seconds,
+        "interval": media_sweeper.interval,
+        "action": media_sweeper.action,
+        "last_report": media_sweeper.last_report,
+    }
+
+
+@router.post("/media/sweep", dependencies=[Depends(get_current_admin)])
+async def sweep_media(dry_run: bool = True):
+    """
+    Remove project images that no project references. Defaults to a dry run
+    that only reports what would be removed.
+    """
+    return await media_sweeper.sweep(dry_run=dry_run)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(get_current_admin)])
+async def get_metrics():
+    """
+    Prometheus metrics for AI predictor calls (latency, tokens, errors, cost),
+    the AI result cache, the AI executor and the public response cache.
+    """
+    return PlainTextResponse(
+        ai_metrics.render(
+            cache_stats=ai_cache.stats(),
+            executor_stats=ai_executor.stats(),
+            response_cache_stats=response_cache.stats(),
+        ),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -1,14 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
 from bson import ObjectId
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 import logging
 
-from server.models.blog import BlogPostCreate, BlogPostUpdate, BlogPostResponse
-from server.services.blog_service import create_blog, update_blog
+from server.models.blog import (
+    BlogPostCreate, BlogPostUpdate, BlogPostResponse, BlogPostSummary, BlogSearchResult, TagCount,
+)
+from server.services.blog_service import (
+    TAG_COUNTS, create_blog, update_blog, delete_blog, stale_ai_sections, search_terms, search_snippet,
+)
+from server.utils.response_cache import response_cache
+from server.utils.pagination import (
+    KEYSET_SORT, keyset_query, next_cursor, encode_value_cursor, decode_value_cursor,
+)
 
 router = APIRouter(prefix="/api/blog", tags=["blog"])
 logger = logging.getLogger(__name__)
 
+# Fields fetched from Mongo for view=summary listings
+SUMMARY_PROJECTION = {name: 1 for name in BlogPostSummary.model_fields if name != "id"}
+
 async def get_blog_collection(request: Request):
     return request.app.state.mongo_client.get_blog_posts_collection()
 
@@ -19,12 +30,15 @@ async def create_post(post: BlogPostCreate, collection=Depends(get_blog_collecti
     return created
 
 
-@router.get("/posts", response_model=List[BlogPostResponse])
+@router.get("/posts", response_model=Union[List[BlogPostResponse], List[BlogPostSummary]])
 async def list_posts(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page; replaces skip"),
     tag: Optional[str] = None,
     published: Optional[bool] = None,
+    view: Literal["full", "summary"] = Query("full", description="summary returns card fields only"),
     collection=Depends(get_blog_collection),
 ):
     query = {}
@@ -33,19 +47,69 @@ async def list_posts(
     if published is not None:
         query["published"] = published
 
-    cursor = collection.find(query).skip(skip).limit(limit).sort("created_at", -1)
-    return await cursor.to_list(length=limit)
+    # Summary listings leave content and AI results in Mongo
+    projection = SUMMARY_PROJECTION if view == "summary" else None
+    response_type = List[BlogPostSummary] if view == "summary" else List[BlogPostResponse]
+
+    async def load():
+        if cursor:
+            results = collection.find(keyset_query(query, cursor), projection).sort(KEYSET_SORT).limit(limit)
+        else:
+            results = collection.find(query, projection).sort(KEYSET_SORT).skip(skip).limit(limit)
+        return await results.to_list(length=limit)
+
+    # The next page's cursor goes in a header so the response body stays a plain list
+    def headers(posts):
+        following = next_cursor(posts, limit)
+        return {"X-Next-Cursor": following} if following else {}
+
+    return await response_cache.respond(request, response_type, ["posts"], load, headers)
+
+
+@router.get("/search", response_model=List[BlogSearchResult])
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=50),
+    published: Optional[bool] = None,
+    collection=Depends(get_blog_collection),
+):
+    """Rank posts against ``q`` with the text index (title > tags > excerpt > content)"""
+    query = {"$text": {"$search": q}}
+    if published is not None:
+        query["published"] = published
+
+    projection = {
+        "title": 1, "excerpt": 1, "author": 1, "tags": 1, "published": 1,
+        "featured_image": 1, "created_at": 1, "content": 1,
+        "score": {"$meta": "textScore"},
+    }
+    cursor = (
+        collection.find(query, projection)
+        .sort([("score", {"$meta": "textScore"})])
+        .skip(skip)
+        .limit(limit)
+    )
+    posts = await cursor.to_list(length=limit)
+
+    terms = search_terms(q)
+    for post in posts:
+        post["snippet"] = search_snippet(post.pop("content", None) or post.get("excerpt"), terms)
+    return posts
 
 
 @router.get("/posts/{post_id}", response_model=BlogPostResponse)
-async def get_post(post_id: str, collection=Depends(get_blog_collection)):
+async def get_post(post_id: str, request: Request, collection=Depends(get_blog_collection)):
     if not ObjectId.is_valid(post_id):
         raise HTTPException(status_code=400, detail="Invalid ID")
     
-    post = await collection.find_one({"_id": ObjectId(post_id)})
-    if not post:
-        raise HTTPException(status_code=404, detail="Not found")
-    return post
+    async def load():
+        post = await collection.find_one({"_id": ObjectId(post_id)})
+        if not post:
+            raise HTTPException(status_code=404, detail="Not found")
+        return post
+
+    return await response_cache.respond(request, BlogPostResponse, [f"post:{post_id}"], load)
 
 
 @router.put("/posts/{post_id}", response_model=BlogPostResponse)
@@ -55,25 +119,47 @@ async def update_post(post_id: str, data: BlogPostUpdate, collection=Depends(get
 
 @router.delete("/posts/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_post(post_id: str, collection=Depends(get_blog_collection)):
-    if not ObjectId.is_valid(post_id):
-        raise HTTPException(status_code=400, detail="Invalid ID")
-    
-    result = await collection.delete_one({"_id": ObjectId(post_id)})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Not found")
+    await delete_blog(post_id, collection)
     return None
 
 
-@router.get("/tags", response_model=List[str])
-async def unique_tags(collection=Depends(get_blog_collection)):
-    pipeline = [
-        {"$unwind": "$tags"},
-        {"$group": {"_id": "$tags"}},
-        {"$sort": {"_id": 1}}
-    ]
-    cursor = collection.aggregate(pipeline)
-    results = await cursor.to_list(length=100)
-    return [doc["_id"] for doc in results]
+@router.get("/tags", response_model=Union[List[TagCount], List[str]])
+async def unique_tags(
+    request: Request,
+    counts: bool = Query(False, description="Return {tag, count} objects instead of tag names"),
+    published: Optional[bool] = Query(None, description="Only count published (true) or unpublished (false) posts"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    collection=Depends(get_blog_collection),
+):
+    """Tags in alphabetical order, read from the incrementally maintained tag counts"""
+    # Same meaning as on /posts: true counts published posts, false unpublished ones
+    if published is None:
+        query = {"total": {"$gt": 0}}
+        count_of = lambda doc: doc["total"]
+    elif published:
+        query = {"published": {"$gt": 0}}
+        count_of = lambda doc: doc["published"]
+    else:
+        query = {"$expr": {"$gt": [{"$subtract": ["$total", "$published"]}, 0]}}
+        count_of = lambda doc: doc["total"] - doc["published"]
+    if cursor:
+        query["_id"] = {"$gt": decode_value_cursor(cursor)}
+
+    async def load():
+        results = collection.database[TAG_COUNTS].find(query).sort("_id", 1).limit(limit)
+        tags = await results.to_list(length=limit)
+        if counts:
+            return [{"tag": doc["_id"], "count": count_of(doc)} for doc in tags]
+        return [doc["_id"] for doc in tags]
+
+    def headers(tags):
+        if len(tags) < limit:
+            return {}
+        return {"X-Next-Cursor": encode_value_cursor(tags[-1]["tag"] if counts else tags[-1])}
+
+    response_type = List[TagCount] if counts else List[str]
+    return await response_cache.respond(request, response_type, ["tags"], load, headers)
 
 
 @router.get("/posts/{post_id}/ai-results")
@@ -85,3 +171,17 @@ async def get_ai_results(post_id: str, collection=Depends(get_blog_collection)):
     if not post:
         raise HTTPException(status_code=404, detail="Not found")
     return post.get("ai_results", {})
+
+
+@router.get("/posts/{post_id}/ai-results/staleness")
+async def get_ai_results_staleness(post_id: str, collection=Depends(get_blog_collection)):
+    if not ObjectId.is_valid(post_id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+
+    post = await collection.find_one(
+        {"_id": ObjectId(post_id)},
+        {"section_hashes": 1, "ai_sections": 1}
+    )
+    if not post:
+        raise HTTPException(status_code=404, detail="Not found")
+    return stale_ai_sections(post)
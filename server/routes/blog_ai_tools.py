@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, Request
-from server.utils.ai_helpers import try_process_ai_request
-from server.models.blog import BlogContentOnly, BlogContentWithTone
+from fastapi import APIRouter, Depends, HTTPException, Request
+from server.utils.ai_helpers import try_process_ai_request, try_process_ai_batch
+from server.models.blog import BlogContentOnly, BlogContentWithTone, BlogAiBatchRequest
+from server.services.ai_jobs import ai_job_queue
+from server.models.auth import get_current_admin
 from server.agents.blog.agent_blog import (
     organize_thoughts,
     edit_blog_content,
@@ -10,7 +12,11 @@ from server.agents.blog.agent_blog import (
     generate_conclusion,
     generate_introduction,
     adjust_tone,
-    prepare_publishing_package
+    prepare_publishing_package,
+    edit_blog_content_chunked,
+    expand_blog_content_chunked,
+    generate_research_directions_chunked,
+    AI_TOOLS
 )
 
 router = APIRouter(prefix="/api/blog/ai", tags=["blog-ai"])
@@ -19,101 +25,173 @@ async def get_blog_collection(request: Request):
     return request.app.state.mongo_client.get_blog_posts_collection()
 
 @router.post("/organize-thoughts")
-async def organize(request: BlogContentOnly, collection=Depends(get_blog_collection)):
+async def organize(request: BlogContentOnly, job: bool = False, collection=Depends(get_blog_collection)):
     return await try_process_ai_request(
         organize_thoughts,
         result_key="organizedThoughts",
         collection=collection,
         post_id=request.post_id,
+        socket_id=request.socket_id,
+        job_queue=ai_job_queue if job else None,
         raw_thoughts=request.blog_content  # <- Function-specific kwarg
     )
 
 @router.post("/edit-content")
-async def edit(request: BlogContentWithTone, collection=Depends(get_blog_collection)):
+async def edit(
+    request: BlogContentWithTone,
+    job: bool = False,
+    chunked: bool = False,
+    collection=Depends(get_blog_collection),
+):
+    # Long drafts can be split into sections and processed concurrently
     return await try_process_ai_request(
-        edit_blog_content,
+        edit_blog_content_chunked if chunked else edit_blog_content,
         result_key="editedContent",
         collection=collection,
         post_id=request.post_id,
+        socket_id=request.socket_id,
+        job_queue=ai_job_queue if job else None,
         blog_content=request.blog_content,
         tone=request.tone
     )
 
 @router.post("/generate-titles")
-async def titles(request: BlogContentWithTone, collection=Depends(get_blog_collection)):
+async def titles(request: BlogContentWithTone, job: bool = False, collection=Depends(get_blog_collection)):
     return await try_process_ai_request(
         generate_titles,
         result_key="titles",
         collection=collection,
         post_id=request.post_id,
+        socket_id=request.socket_id,
+        job_queue=ai_job_queue if job else None,
         blog_content=request.blog_content,
         tone=request.tone
     )
 
 
 @router.post("/expand-blog-content")
-async def expand(request: BlogContentWithTone, collection=Depends(get_blog_collection)):
+async def expand(
+    request: BlogContentWithTone,
+    job: bool = False,
+    chunked: bool = False,
+    collection=Depends(get_blog_collection),
+):
+    # Long drafts can be split into sections and processed concurrently
     return await try_process_ai_request(
-        expand_blog_content,
+        expand_blog_content_chunked if chunked else expand_blog_content,
         result_key="expandedPoints",
         collection=collection,
         post_id=request.post_id,
+        socket_id=request.socket_id,
+        job_queue=ai_job_queue if job else None,
         blog_content=request.blog_content,
         tone=request.tone
     )
 
 @router.post("/generate-research-directions")
-async def research(request: BlogContentOnly, collection=Depends(get_blog_collection)):
+async def research(
+    request: BlogContentOnly,
+    job: bool = False,
+    chunked: bool = False,
+    collection=Depends(get_blog_collection),
+):
+    # Long drafts can be split into sections and processed concurrently
     return await try_process_ai_request(
-        generate_research_directions,
+        generate_research_directions_chunked if chunked else generate_research_directions,
         result_key="researchDirections",
         collection=collection,
         post_id=request.post_id,
+        socket_id=request.socket_id,
+        job_queue=ai_job_queue if job else None,
         blog_content=request.blog_content
     )
 
 
 @router.post("/adjust-tone")
-async def tone(request: BlogContentWithTone, collection=Depends(get_blog_collection)):
+async def tone(request: BlogContentWithTone, job: bool = False, collection=Depends(get_blog_collection)):
     return await try_process_ai_request(
         adjust_tone,
         result_key="adjustedTone",
         collection=collection,
         post_id=request.post_id,
+        socket_id=request.socket_id,
+        job_queue=ai_job_queue if job else None,
         blog_content=request.blog_content,
         tone=request.tone
     )
 
 
 @router.post("/generate-conclusion")
-async def conclusion(request: BlogContentWithTone, collection=Depends(get_blog_collection)):
+async def conclusion(request: BlogContentWithTone, job: bool = False, collection=Depends(get_blog_collection)):
     return await try_process_ai_request(
         generate_conclusion,
         result_key="conclusion",
         collection=collection,
         post_id=request.post_id,
+        socket_id=request.socket_id,
+        job_queue=ai_job_queue if job else None,
         blog_content=request.blog_content,
         tone=request.tone
     )
 
 @router.post("/generate-introduction")
-async def intro(request: BlogContentWithTone, collection=Depends(get_blog_collection)):
+async def intro(request: BlogContentWithTone, job: bool = False, collection=Depends(get_blog_collection)):
     return await try_process_ai_request(
         generate_introduction,
         result_key="introduction",
         collection=collection,
         post_id=request.post_id,
+        socket_id=request.socket_id,
+        job_queue=ai_job_queue if job else None,
         blog_content=request.blog_content,
         tone=request.tone
     )
 
 @router.post("/prepare-publishing-package")
-async def publishing(request: BlogContentWithTone, collection=Depends(get_blog_collection)):
+async def publishing(request: BlogContentWithTone, job: bool = False, collection=Depends(get_blog_collection)):
     return await try_process_ai_request(
         prepare_publishing_package,
         result_key="publishingPackage",
         collection=collection,
         post_id=request.post_id,
+        socket_id=request.socket_id,
+        job_queue=ai_job_queue if job else None,
         blog_content=request.blog_content,
         tone=request.tone
-    )
\ No newline at end of file
+    )
+
+@router.post("/batch")
+async def batch(request: BlogAiBatchRequest, collection=Depends(get_blog_collection)):
+    fields = {"blog_content": request.blog_content, "tone": request.tone}
+    tools = {}
+    owners = {}
+    for name in dict.fromkeys(request.tools):
+        tool = AI_TOOLS.get(name)
+        if tool is None:
+            raise HTTPException(status_code=400, detail=f"Unknown AI tool: {name}")
+        # Results are returned and saved by result key, so two tools sharing one
+        # (e.g. edit_blog_content and edit_blog_content_chunked) would overwrite each other
+        if tool["result_key"] in owners:
+            raise HTTPException(
+                status_code=422,
+                detail=f"{owners[tool['result_key']]} and {name} both produce {tool['result_key']}; request only one",
+            )
+        owners[tool["result_key"]] = name
+        if "tone" in tool["inputs"].values() and not request.tone:
+            raise HTTPException(status_code=400, detail=f"AI tool {name} requires a tone")
+        inputs = {arg: fields[field] for arg, field in tool["inputs"].items()}
+        tools[name] = (tool["fn"], tool["result_key"], inputs)
+
+    if not tools:
+        raise HTTPException(status_code=400, detail="No AI tools requested")
+
+    return await try_process_ai_batch(tools, collection=collection, post_id=request.post_id)
+
+
+@router.get("/jobs/{job_id}", dependencies=[Depends(get_current_admin)])
+async def get_job(job_id: str):
+    job = await ai_job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job["job_id"] = job.pop("_id")
+    return job
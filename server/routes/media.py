@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Response
+from server.services.image_workers import supported_formats
+from server.services.media_service import MAX_DIMENSION, media_root
+from server.services.media_renditions import rendition_cache
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter(prefix="/api/media", tags=["media"])
+
+# Stored images are named after their content hash, so a URL never changes meaning
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@router.get("/{name}")
+async def get_media(
+    name: str,
+    width: Optional[int] = Query(None, ge=16, le=MAX_DIMENSION),
+    format: str = "webp",
+    quality: Optional[int] = Query(None, ge=1, le=100),
+):
+    """Serve a stored project image resized and re-encoded on demand
+
+    ``width`` is rounded up to the next configured breakpoint and ``quality``
+    to the nearest preset, so arbitrary values cannot fill the rendition cache.
+    """
+    if name != os.path.basename(name) or name.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid media name")
+
+    fmt = format.lower()
+    if fmt not in supported_formats([fmt]):
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+
+    source_path = os.path.join(media_root(), "projects", name)
+    if not os.path.isfile(source_path):
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    try:
+        file = await rendition_cache.open(source_path, width, fmt, quality or rendition_cache.default_quality(fmt))
+    except Exception as e:
+        logger.error("Failed to render %s: %s", name, str(e))
+        raise HTTPException(status_code=500, detail=f"Failed to render media: {str(e)}")
+
+    # Read through the open handle: the cache may evict the file once we yield
+    with file:
+        content = await asyncio.to_thread(file.read)
+    return Response(content=content, media_type=f"image/{fmt}", headers={"Cache-Control": CACHE_CONTROL})
@@ -2,10 +2,12 @@ import json
 import logging
 from datetime import datetime
 from bson import ObjectId
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends, status, Request, UploadFile, File, Form
+from typing import List, Literal, Optional, Union
+from fastapi import APIRouter, HTTPException, Depends, Query, status, Request, UploadFile, File, Form
 from server.services.media_service import MediaService
-from server.models.projects import ProjectResponse
+from server.models.projects import ProjectResponse, ProjectCard
+from server.utils.response_cache import response_cache
+from server.utils.pagination import KEYSET_SORT, keyset_query, next_cursor
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -13,10 +15,16 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
+# Card listings leave the code samples in Mongo
+CARD_PROJECTION = {"project_details.clientCode": 0, "project_details.serverCode": 0}
+
 async def get_projects_collection(request: Request):
     return request.app.state.mongo_client.db.projects
 
-async def process_project_images_from_form(form_data, project_dict):
+async def get_media_collection(request: Request):
+    return request.app.state.mongo_client.db.media
+
+async def process_project_images_from_form(form_data, project_dict, media_collection=None):
     """
     Process images directly from the form data
     """
@@ -26,7 +34,8 @@ async def process_project_images_from_form(form_data, project_dict):
     image_keys = [k for k in form_data.keys() if k.startswith('image_') and not k.endswith('_description')]
     
     if image_keys:
-        uploaded_images = []
+        files = []
+        descriptions = []
         for key in image_keys:
             file = form_data[key]
             if not isinstance(file, UploadFile):
@@ -35,14 +44,15 @@ async def process_project_images_from_form(form_data, project_dict):
             # Extract the index from the key (image_0, image_1, etc.)
             index = key.split('_')[1]
             description_key = f"image_{index}_description"
-            description = form_data.get(description_key, "")
-            
-            # Upload the image and get the path
-            upload_result = await MediaService.upload_project_image(file)
-            uploaded_images.append({
-                "image": upload_result["path"],
-                "description": description
-            })
+            files.append(file)
+            descriptions.append(form_data.get(description_key, ""))
+        
+        # Upload the images concurrently and get the paths
+        upload_results = await MediaService.upload_project_images(files, media_collection)
+        uploaded_images = [
+            {"image": upload_result["path"], "description": description, "variants": upload_result["variants"]}
+            for upload_result, description in zip(upload_results, descriptions)
+        ]
         
         # Combine with any existing images from the project data
         if "images" in result:
@@ -54,7 +64,7 @@ async def process_project_images_from_form(form_data, project_dict):
     if "imagesToDelete" in result and result["imagesToDelete"]:
         # Try to delete the files
         for image_path in result["imagesToDelete"]:
-            await MediaService.delete_project_image(image_path)
+            await MediaService.delete_project_image(image_path, media_collection)
         
         # Remove deleted images from the database record
         if "images" in result:
@@ -68,12 +78,28 @@ async def process_project_images_from_form(form_data, project_dict):
     
     return result
 
+async def fill_image_variants(images, stored_images=(), media_collection=None):
+    """Restore the variants of images sent back without them, matched by path
+
+    The admin form may return existing images as just ``{image, description}``;
+    their variants come from the stored project, or else from the media record.
+    """
+    variants = {img["image"]: img["variants"] for img in stored_images if img.get("variants")}
+    missing = {img["image"] for img in images if not img.get("variants") and img.get("image") not in variants}
+    if missing and media_collection is not None:
+        async for media in media_collection.find({"path": {"$in": list(missing)}}, {"path": 1, "variants": 1}):
+            variants[media["path"]] = media.get("variants", {})
+    for img in images:
+        if not img.get("variants") and img.get("image") in variants:
+            img["variants"] = variants[img["image"]]
+
 @router.post("", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
 async def create_project(
     projectData: str = Form(...),
     imageDescriptions: str = Form(None),
     image_files: List[UploadFile] = File(None),
-    collection=Depends(get_projects_collection)
+    collection=Depends(get_projects_collection),
+    media_collection=Depends(get_media_collection)
 ):
     """Create a new project with image uploads"""
     try:
@@ -86,18 +112,18 @@ async def create_project(
             descriptions = json.loads(imageDescriptions)
         
         # Process images - match files with descriptions based on index
+        uploaded_images = []
         if image_files and len(image_files) > 0:
-            uploaded_images = []
+            # Upload the images concurrently
+            upload_results = await MediaService.upload_project_images(image_files, media_collection)
             
-            for i, file in enumerate(image_files):
+            for i, upload_result in enumerate(upload_results):
                 # Get description from the list if available
                 description = descriptions[i] if i < len(descriptions) else ""
-                
-                # Upload the image
-                upload_result = await MediaService.upload_project_image(file)
                 uploaded_images.append({
                     "image": upload_result["path"],
-                    "description": description
+                    "description": description,
+                    "variants": upload_result["variants"]
                 })
             
             # Add the new images
@@ -106,6 +132,8 @@ async def create_project(
             else:
                 project_dict["images"] = uploaded_images
         
+        await fill_image_variants(project_dict.get("images", []), media_collection=media_collection)
+        
         # Add timestamps
         project_dict["created_at"] = datetime.utcnow()
         project_dict["updated_at"] = datetime.utcnow()
@@ -114,11 +142,19 @@ async def create_project(
         if "ProjectDetails" in project_dict and "project_details" not in project_dict:
             project_dict["project_details"] = project_dict.pop("ProjectDetails")
         
-        # Insert the new project
-        result = await collection.insert_one(project_dict)
+        # Insert the new project, releasing this request's uploads if that fails
+        try:
+            result = await collection.insert_one(project_dict)
+        except Exception:
+            await MediaService.release_project_images([image["image"] for image in uploaded_images], media_collection)
+            raise
         
-        created_project = await collection.find_one({"_id": result.inserted_id})
-        return ProjectResponse.from_mongo(created_project)
+        response_cache.invalidate("projects")
+        
+        # Validated once, by the response model
+        return await collection.find_one({"_id": result.inserted_id})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to create project: {str(e)}")
 
@@ -128,7 +164,8 @@ async def update_project(
     projectData: str = Form(...),
     imageDescriptions: str = Form(None),
     image_files: List[UploadFile] = File(None),
-    collection=Depends(get_projects_collection)
+    collection=Depends(get_projects_collection),
+    media_collection=Depends(get_media_collection)
 ):
     """Update a project with image uploads"""
     try:
@@ -151,18 +188,18 @@ async def update_project(
             descriptions = json.loads(imageDescriptions)
         
         # Process images - match files with descriptions based on index
+        uploaded_images = []
         if image_files and len(image_files) > 0:
-            uploaded_images = []
+            # Upload the images concurrently
+            upload_results = await MediaService.upload_project_images(image_files, media_collection)
             
-            for i, file in enumerate(image_files):
+            for i, upload_result in enumerate(upload_results):
                 # Get description from the list if available
                 description = descriptions[i] if i < len(descriptions) else ""
-                
-                # Upload the image
-                upload_result = await MediaService.upload_project_image(file)
                 uploaded_images.append({
                     "image": upload_result["path"],
-                    "description": description
+                    "description": description,
+                    "variants": upload_result["variants"]
                 })
             
             # Add the new images to existing ones
@@ -174,7 +211,7 @@ async def update_project(
         # Handle image deletions
         if "imagesToDelete" in update_dict and update_dict["imagesToDelete"]:
             for image_path in update_dict["imagesToDelete"]:
-                await MediaService.delete_project_image(image_path)
+                await MediaService.delete_project_image(image_path, media_collection)
             
             if "images" in update_dict:
                 update_dict["images"] = [
@@ -184,49 +221,87 @@ async def update_project(
             
             del update_dict["imagesToDelete"]
         
+        if "images" in update_dict:
+            await fill_image_variants(update_dict["images"], project.get("images", []), media_collection)
+        
         # Update the project
         if "_id" in update_dict:
             update_dict.pop("_id")
         
         update_dict["updated_at"] = datetime.utcnow()
         
-        await collection.update_one(
-            {"_id": project_id_obj},
-            {"$set": update_dict}
-        )
+        try:
+            await collection.update_one(
+                {"_id": project_id_obj},
+                {"$set": update_dict}
+            )
+        except Exception:
+            await MediaService.release_project_images([image["image"] for image in uploaded_images], media_collection)
+            raise
+        response_cache.invalidate("projects", f"project:{project_id}")
     
-        updated_project = await collection.find_one({"_id": project_id_obj})
-        return ProjectResponse.from_mongo(updated_project)
+        # Validated once, by the response model
+        return await collection.find_one({"_id": project_id_obj})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to update project: {str(e)}")
 
-@router.get("", response_model=List[ProjectResponse])
+@router.get("", response_model=Union[List[ProjectResponse], List[ProjectCard]])
 async def get_projects(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Page size; without it every project is returned"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    published: Optional[bool] = None,
+    view: Literal["full", "card"] = Query("full", description="card omits clientCode and serverCode"),
     collection=Depends(get_projects_collection)
 ):
-    """Get all projects"""
+    """Get projects, newest first when paginated"""
+    query = {}
+    if published is not None:
+        query["project_details.published"] = published
+
+    projection = CARD_PROJECTION if view == "card" else None
+    response_type = List[ProjectCard] if view == "card" else List[ProjectResponse]
+    paginated = limit is not None or cursor is not None
+    page_size = limit or 20
 
-    cursor = collection.find()
-    projects = await cursor.to_list(length=None)
+    async def load():
+        if not paginated:
+            # Unpaginated requests keep the original unordered, return-everything behaviour
+            return await collection.find(query, projection).to_list(length=None)
+        results = collection.find(keyset_query(query, cursor), projection).sort(KEYSET_SORT).limit(page_size)
+        return await results.to_list(length=page_size)
 
-    return [ProjectResponse.from_mongo(project) for project in projects]
+    def headers(projects):
+        following = next_cursor(projects, page_size) if paginated else None
+        return {"X-Next-Cursor": following} if following else {}
+
+    # Project data is stored as submitted, so it is validated on the way out
+    return await response_cache.respond(request, response_type, ["projects"], load, headers, trusted=False)
 
 @router.get("/{project_id}", response_model=ProjectResponse)
-async def get_project(project_id: str, collection=Depends(get_projects_collection)):
+async def get_project(project_id: str, request: Request, collection=Depends(get_projects_collection)):
     """Get a specific project by ID"""
     try:
         project_id_obj = ObjectId(project_id)
     except:
         raise HTTPException(status_code=400, detail="Invalid project ID format")
     
-    project = await collection.find_one({"_id": project_id_obj})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    async def load():
+        project = await collection.find_one({"_id": project_id_obj})
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return project
     
-    return ProjectResponse.from_mongo(project)
+    return await response_cache.respond(request, ProjectResponse, [f"project:{project_id}"], load, trusted=False)
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_project(project_id: str, collection=Depends(get_projects_collection)):
+async def delete_project(
+    project_id: str,
+    collection=Depends(get_projects_collection),
+    media_collection=Depends(get_media_collection)
+):
     """Delete a project"""
     try:
         project_id_obj = ObjectId(project_id)
@@ -240,5 +315,10 @@ async def delete_project(project_id: str, collection=Depends(get_projects_collec
     
     # Delete the project
     await collection.delete_one({"_id": project_id_obj})
+    response_cache.invalidate("projects", f"project:{project_id}")
+    
+    # Release its images; files are removed once no other project uses them
+    for image in project.get("images", []):
+        await MediaService.delete_project_image(image.get("image"), media_collection)
     
     return None
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from server.services.SocketClient import socket_client
+from server.utils.ai_cache import ai_cache
+from server.utils.ai_helpers import run_ai_tool, save_ai_result, sections_of
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class AIJobQueue:
+    """Background queue for AI tool requests.
+
+    Submitting returns a job id immediately; a pool of worker tasks runs the
+    job, saves the result on every post that asked for it and pushes an
+    ``ai_job_done``/``ai_job_failed`` event to the submitters' Socket.IO
+    clients. Jobs are stored in Mongo so queued work survives a restart, and a
+    submission matching a queued or running job joins it instead of calling
+    the LLM again. Queued and running jobs carry ``in_flight: True``, which a
+    unique partial index on ``key`` keeps to one job per key.
+    """
+
+    def __init__(self, workers: int, finished_ttl: int, collection_name: str = "ai_jobs"):
+        self.workers = workers
+        self.finished_ttl = finished_ttl
+        self.collection_name = collection_name
+        self._collection = None
+        self._posts = None
+        self._tools = {}
+        self._queue = asyncio.Queue()
+        self._tasks = []
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            workers=int(os.getenv("AI_JOB_WORKERS", "4")),
+            finished_ttl=int(os.getenv("AI_JOB_TTL", str(24 * 3600))),
+        )
+
+    async def start(self, db, tools: dict):
+        """Attach to ``db``, requeue unfinished jobs and start the workers.
+
+        ``tools`` maps tool names to entries with an ``fn``, as in ``AI_TOOLS``.
+        """
+        self._collection = db[self.collection_name]
+        self._posts = db["blog_posts"]
+        self._tools = tools
+
+        # Jobs that were running when the process died never finished, so run them again
+        await self._collection.update_many({"status": RUNNING}, {"$set": {"status": QUEUED}})
+        pending = self._collection.find({"status": QUEUED}, {"_id": 1}).sort("created_at", 1)
+        requeued = 0
+        async for job in pending:
+            self._queue.put_nowait(job["_id"])
+            requeued += 1
+        if requeued:
+            logger.info("Requeued %d unfinished AI jobs", requeued)
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, fn, *, result_key: str, post_id: str = None, save: bool = True,
+                     socket_id: str = None, **inputs) -> dict:
+        """Queue ``fn(**inputs)`` and return the job id and its current status."""
+        if fn.__name__ not in self._tools:
+            raise ValueError(f"{fn.__name__} is not a registered AI tool")
+
+        key = ai_cache.make_key(fn, inputs)
+        joiners = {}
+        if save and post_id:
+            joiners["post_ids"] = post_id
+        if socket_id:
+            joiners["socket_ids"] = socket_id
+
+        # Join an identical job that is still in flight, or create it, in one atomic upsert
+        job_id = uuid.uuid4().hex
+        new_job = {
+            "_id": job_id,
+            "tool": fn.__name__,
+            "result_key": result_key,
+            "inputs": inputs,
+            "status": QUEUED,
+            "created_at": datetime.utcnow(),
+        }
+        new_job.update({field: [] for field in ("post_ids", "socket_ids") if field not in joiners})
+        update = {"$setOnInsert": new_job}
+        if joiners:
+            update["$addToSet"] = joiners
+        try:
+            job = await self._collection.find_one_and_update(
+                {"key": key, "in_flight": True}, update,
+                projection={"status": 1}, upsert=True, return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # A concurrent submission inserted the job first; join it
+            job = await self._collection.find_one_and_update(
+                {"key": key, "in_flight": True}, update,
+                projection={"status": 1}, return_document=ReturnDocument.AFTER,
+            )
+        if job is None:
+            raise RuntimeError(f"Could not submit AI job for {fn.__name__}")
+        if job["_id"] != job_id:
+            logger.info("Joined in-flight AI job %s for %s", job["_id"], fn.__name__)
+            return {"job_id": job["_id"], "status": job["status"]}
+
+        self._queue.put_nowait(job_id)
+        logger.info("Queued AI job %s for %s", job_id, fn.__name__)
+        return {"job_id": job_id, "status": QUEUED}
+
+    async def get(self, job_id: str):
+        return await self._collection.find_one({"_id": job_id}, {"key": 0, "inputs": 0})
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                # Stopping; the job stays running and start() requeues it
+                if asyncio.current_task().cancelling():
+                    raise
+                logger.error(f"AI job worker was interrupted on job {job_id}")
+            except Exception as e:
+                logger.error(f"AI job worker failed on job {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await self._collection.find_one_and_update(
+            {"_id": job_id, "status": QUEUED},
+            {"$set": {"status": RUNNING, "started_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            return
+
+        try:
+            fn = self._tools[job["tool"]]["fn"]
+            result = await run_ai_tool(fn, result_key=job["result_key"], **job["inputs"])
+            update = {"status": DONE, "result": result}
+            event = "ai_job_done"
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+            # A cancellation that was not aimed at this worker fails the job instead of stranding it
+            logger.error(f"AI job {job_id} was cancelled")
+            update = {"status": FAILED, "error": "AI call was cancelled"}
+            event = "ai_job_failed"
+        except Exception as e:
+            logger.error(f"AI job {job_id} failed: {str(e)}")
+            error = getattr(e, "detail", None) or str(e)
+            update = {"status": FAILED, "error": error}
+            event = "ai_job_failed"
+        update["finished_at"] = datetime.utcnow()
+
+        # Posts and clients that joined while the job ran are included in the returned document
+        job = await self._collection.find_one_and_update(
+            {"_id": job_id},
+            {"$set": update, "$unset": {"in_flight": ""}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+        if job["status"] == DONE:
+            hashes = sections_of(fn, job["inputs"])
+            for post_id in job["post_ids"]:
+                await save_ai_result(self._posts, post_id, job["result_key"], job["result"], hashes)
+
+        payload = {"job_id": job_id, "tool": job["tool"], "result_key": job["result_key"],
+                   "status": job["status"], "result": job.get("result"), "error": job.get("error")}
+        for socket_id in job["socket_ids"]:
+            await socket_client.emit(event, payload, to=socket_id)
+
+
+ai_job_queue = AIJobQueue.from_env()
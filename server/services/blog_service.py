@@ -1,15 +1,28 @@
+import html
+import logging
+import re
 from datetime import datetime
 from bson import ObjectId
 from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+from server.agents.blog.chunking import section_hashes
+from server.utils.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+TAG_COUNTS = "tag_counts"
 
 async def create_blog(post_data, collection):
     now = datetime.utcnow()
     post_data.update({
         "created_at": now,
         "updated_at": now,
-        "ai_results": {}
+        "ai_results": {},
+        "section_hashes": section_hashes(post_data.get("content") or ""),
     })
     result = await collection.insert_one(post_data)
+    await update_tag_counts(collection, None, post_data)
+    response_cache.invalidate("posts", "tags")
     return await collection.find_one({"_id": result.inserted_id})
 
 
@@ -19,15 +32,147 @@ async def update_blog(post_id, data, collection):
     
     update_data = {k: v for k, v in data.items() if v is not None}
     update_data["updated_at"] = datetime.utcnow()
+    if "content" in update_data:
+        # Lets section-aware AI results be compared against the new revision
+        update_data["section_hashes"] = section_hashes(update_data["content"])
 
     if not update_data:
         raise HTTPException(status_code=400, detail="No valid update data provided")
 
-    result = await collection.update_one(
+    # The previous tags and published flag give the tag count diff
+    previous = await collection.find_one_and_update(
         {"_id": ObjectId(post_id)},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection={"tags": 1, "published": 1},
+        return_document=ReturnDocument.BEFORE,
     )
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Not found")
+    await update_tag_counts(collection, previous, {**previous, **update_data})
+    response_cache.invalidate("posts", f"post:{post_id}", "tags")
 
     return await collection.find_one({"_id": ObjectId(post_id)})
+
+
+async def delete_blog(post_id, collection):
+    if not ObjectId.is_valid(post_id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+
+    deleted = await collection.find_one_and_delete(
+        {"_id": ObjectId(post_id)},
+        projection={"tags": 1, "published": 1},
+    )
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    await update_tag_counts(collection, deleted, None)
+    response_cache.invalidate("posts", f"post:{post_id}", "tags")
+
+
+def _tag_counts_of(post):
+    if not post:
+        return {}
+    published = 1 if post.get("published") else 0
+    return {tag: (1, published) for tag in set(post.get("tags") or [])}
+
+
+async def update_tag_counts(collection, old_post, new_post):
+    """Apply the change from ``old_post`` to ``new_post`` (None when absent) to the tag counts.
+
+    Each tag document holds how many posts carry the tag in ``total`` and how
+    many of those are published in ``published``; tags left on no post are
+    removed.
+    """
+    old, new = _tag_counts_of(old_post), _tag_counts_of(new_post)
+    updates = []
+    for tag in old.keys() | new.keys():
+        old_total, old_published = old.get(tag, (0, 0))
+        new_total, new_published = new.get(tag, (0, 0))
+        if (old_total, old_published) != (new_total, new_published):
+            updates.append(UpdateOne(
+                {"_id": tag},
+                {"$inc": {"total": new_total - old_total, "published": new_published - old_published}},
+                upsert=True,
+            ))
+    if not updates:
+        return
+
+    tag_counts = collection.database[TAG_COUNTS]
+    await tag_counts.bulk_write(updates, ordered=False)
+    removed = [tag for tag in old if tag not in new]
+    if removed:
+        await tag_counts.delete_many({"_id": {"$in": removed}, "total": {"$lte": 0}})
+
+
+async def rebuild_tag_counts(collection):
+    """Recount every tag from the posts, replacing the tag counts collection."""
+    pipeline = [
+        {"$project": {"tags": {"$setUnion": [{"$ifNull": ["$tags", []]}, []]}, "published": 1}},
+        {"$unwind": "$tags"},
+        {"$group": {
+            "_id": "$tags",
+            "total": {"$sum": 1},
+            "published": {"$sum": {"$cond": [{"$eq": ["$published", True]}, 1, 0]}},
+        }},
+        {"$out": TAG_COUNTS},
+    ]
+    await collection.aggregate(pipeline).to_list(length=None)
+
+
+async def ensure_tag_counts(collection):
+    """Backfill the tag counts on first start after they were introduced."""
+    tag_counts = collection.database[TAG_COUNTS]
+    if await tag_counts.estimated_document_count() == 0 and await collection.estimated_document_count() > 0:
+        logger.info("Backfilling tag counts")
+        await rebuild_tag_counts(collection)
+
+
+def search_terms(query: str):
+    """Words of a text search, without negated terms and phrase quotes."""
+    return [word.strip('"') for word in query.split() if not word.startswith("-") and word.strip('"')]
+
+
+def search_snippet(text: str, terms, width: int = 200) -> str:
+    """HTML-escaped window of ``text`` around the first match, with matches wrapped in <mark>.
+
+    Terms match at word starts so that stemmed forms ("publish" in
+    "publishing") are highlighted too.
+    """
+    text = text or ""
+    if not terms:
+        return html.escape(text[:width])
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")\w*", re.IGNORECASE)
+    first = pattern.search(text)
+    start = max(0, first.start() - width // 4) if first else 0
+    if start:
+        # Start the window at a word boundary
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < (first.start() if first else start + width) else start
+    window = text[start:start + width]
+
+    parts, last = [], 0
+    for match in pattern.finditer(window):
+        parts.append(html.escape(window[last:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        last = match.end()
+    parts.append(html.escape(window[last:]))
+    snippet = "".join(parts).strip()
+    if start:
+        snippet = "…" + snippet
+    if start + width < len(text):
+        snippet += "…"
+    return snippet
+
+
+def stale_ai_sections(post):
+    """Compare each section-aware AI result with the post's current sections.
+
+    Returns, per result key, how many of the current sections the result does
+    not cover yet (i.e. would be sent to the LLM on a re-run).
+    """
+    current = post.get("section_hashes") or []
+    report = {}
+    for key, hashes in (post.get("ai_sections") or {}).items():
+        covered = set(hashes)
+        changed = sum(1 for h in current if h not in covered)
+        report[key] = {"total_sections": len(current), "changed_sections": changed, "stale": changed > 0}
+    return report
@@ -0,0 +1,148 @@
+"""Image decoding and encoding run in the image process pool.
+
+Pool workers are spawned processes that import this module to unpickle the
+task, so it depends on nothing but Pillow: importing the rest of the server
+would load DSPy, the app and every router into each worker.
+"""
+import os
+from PIL import Image
+
+class ImageTooLarge(ValueError):
+    """Raised when an upload exceeds the byte or pixel limits."""
+
+_SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 85, "method": 6},
+    "avif": {"format": "AVIF", "quality": 60, "speed": 6},
+}
+
+def supported_formats(formats):
+    """Those of ``formats`` that can be written here, in order."""
+    try:
+        import pillow_avif  # noqa: F401  (registers AVIF on Pillow < 11.2)
+    except ImportError:
+        pass
+    Image.init()
+    return [f for f in formats if f in _SAVE_OPTIONS and _SAVE_OPTIONS[f]["format"] in Image.SAVE]
+
+def _reset_peak_rss():
+    """Reset this process's RSS high-water mark (Linux), so VmHWM covers only what follows."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def _status_kb(field: str):
+    """A ``kB`` figure from /proc/self/status, or None where it is unavailable."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def encode_variants(source_path: str, directory: str, stem: str, widths, formats,
+                    max_pixels: int, max_dimension: int) -> dict:
+    """Decode an uploaded image and write all of its variants. Runs in the image process pool.
+
+    ``<stem>.webp`` is always written at the decoded resolution, whose longest
+    side is capped at ``max_dimension``. Each requested width narrower than
+    that (and "original") is written in every supported format as
+    ``<stem>_<width>.<format>``, or ``<stem>.<format>`` for the original.
+    Returns the variants keyed ``"<width>.<format>"`` and memory figures for
+    logging, measured for this call only.
+    """
+    _reset_peak_rss()
+    rss_before = _status_kb("VmRSS")
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        original_img = Image.open(source_path)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    source_size = original_img.size
+    if original_img.width * original_img.height > max_pixels:
+        raise ImageTooLarge(f"Image is {original_img.width}x{original_img.height}, over the {max_pixels} pixel limit")
+
+    # JPEG can decode straight at a reduced scale; other formats are decoded
+    # at full size and reduce()d before resampling
+    if max(original_img.size) > max_dimension:
+        scale = max_dimension / max(original_img.size)
+        target = (max(1, round(original_img.width * scale)), max(1, round(original_img.height * scale)))
+        original_img.draft("RGB", target)
+        original_img.thumbnail(target, Image.LANCZOS, reducing_gap=2.0)
+
+    # Convert to RGB if needed (WebP doesn't support RGBA in some cases)
+    if original_img.mode == 'RGBA':
+        original_img = original_img.convert('RGBA')
+    else:
+        original_img = original_img.convert('RGB')
+
+    formats = supported_formats(formats)
+
+    def save(img, filename, fmt):
+        file_path = os.path.join(directory, filename)
+        options = dict(_SAVE_OPTIONS[fmt])
+        # Written aside and moved into place, so readers never see a partial file
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        img.save(tmp_path, options.pop("format"), **options)
+        os.replace(tmp_path, file_path)
+        return {
+            "filename": filename,
+            "format": fmt,
+            "width": img.width,
+            "height": img.height,
+            "bytes": os.path.getsize(file_path),
+        }
+
+    # The full-resolution WebP is the image's canonical path
+    full_webp = save(original_img, f"{stem}.webp", "webp")
+
+    variants = {}
+    for width in widths:
+        if width == "original":
+            for fmt in formats:
+                variants[f"original.{fmt}"] = dict(full_webp) if fmt == "webp" else save(original_img, f"{stem}.{fmt}", fmt)
+            continue
+
+        width = int(width)
+        if width >= original_img.width:
+            continue
+        height = max(1, round(original_img.height * width / original_img.width))
+        img = original_img.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        for fmt in formats:
+            variants[f"{width}.{fmt}"] = save(img, f"{stem}_{width}.{fmt}", fmt)
+
+    # VmHWM was reset above, so the peak is this upload's, not the worker's lifetime
+    peak = _status_kb("VmHWM")
+    memory = {
+        "source_size": source_size,
+        "decoded_size": original_img.size,
+        "decoded_bytes": original_img.width * original_img.height * len(original_img.getbands()),
+        "call_peak_rss_kb": peak,
+        "call_peak_growth_kb": peak - rss_before if peak is not None and rss_before is not None else None,
+    }
+    return variants, memory
+
+def render_rendition(source_path: str, dest_path: str, width: int, fmt: str, quality: int) -> int:
+    """Write one resized/re-encoded copy of a stored image. Runs in the image process pool.
+
+    The image is never upscaled. The file is written under a temporary name
+    and moved into place, so readers never see a partial rendition. Returns
+    the size of the written file.
+    """
+    if fmt not in supported_formats([fmt]):
+        raise ValueError(f"Unsupported format: {fmt}")
+    with Image.open(source_path) as img:
+        if width and width < img.width:
+            height = max(1, round(img.height * width / img.width))
+            img.draft("RGB", (width, height))
+            img = img.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        img = img.convert('RGBA' if img.mode == 'RGBA' else 'RGB')
+
+        options = dict(_SAVE_OPTIONS[fmt], quality=quality)
+        tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+        img.save(tmp_path, options.pop("format"), **options)
+    os.replace(tmp_path, dest_path)
+    return os.path.getsize(dest_path)
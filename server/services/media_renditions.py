@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import OrderedDict
+from server.services.image_workers import _SAVE_OPTIONS, render_rendition
+from server.services.media_service import MAX_DIMENSION, get_image_pool, media_root
+
+logger = logging.getLogger(__name__)
+
+
+class RenditionCache:
+    """On-disk cache of images rendered on demand from the stored originals.
+
+    Renditions are named after their source, width, format and quality, and
+    evicted least recently used first once their total size passes
+    ``max_bytes``. Concurrent requests for a rendition that is still being
+    rendered wait for that render instead of starting another.
+
+    Requested widths and qualities are snapped to ``widths`` and
+    ``qualities``, so the number of distinct renditions per image is bounded,
+    and at most ``concurrency`` renders use the image pool at once, leaving
+    the rest of it to uploads.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, widths, qualities, concurrency: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.widths = sorted(widths)
+        self.qualities = sorted(qualities)
+        self._render_slots = asyncio.Semaphore(concurrency)
+        self._entries = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            directory=os.getenv("MEDIA_RENDITIONS_DIR") or os.path.join(media_root(), "renditions"),
+            max_bytes=int(os.getenv("MEDIA_RENDITIONS_MAX_BYTES", str(512 * 1024 * 1024))),
+            widths=[int(w) for w in os.getenv("MEDIA_RENDITION_WIDTHS", "320,640,960,1280,1920,2560").split(",")
+                    if w.strip() and int(w) <= MAX_DIMENSION],
+            qualities=[int(q) for q in os.getenv("MEDIA_RENDITION_QUALITIES", "50,60,75,85").split(",") if q.strip()],
+            concurrency=int(os.getenv("MEDIA_RENDITION_CONCURRENCY", "2")),
+        )
+
+    def snap_width(self, width: int) -> int:
+        """The smallest configured width at least ``width`` wide (the largest one if none is)."""
+        return next((w for w in self.widths if w >= width), self.widths[-1])
+
+    def snap_quality(self, quality: int) -> int:
+        """The configured quality closest to ``quality``."""
+        return min(self.qualities, key=lambda q: (abs(q - quality), q))
+
+    def _load(self):
+        """Index renditions left on disk by a previous process, oldest access first."""
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".tmp"):
+                    os.remove(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    found.append((stat.st_atime, entry.name, stat.st_size))
+        self._entries = OrderedDict((name, size) for _, name, size in sorted(found))
+        self._bytes = sum(self._entries.values())
+        self._evict()
+
+    def _add(self, filename: str, size: int):
+        with self._lock:
+            self._bytes += size - self._entries.pop(filename, 0)
+            self._entries[filename] = size
+            self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            filename, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._evictions += 1
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+
+    async def get(self, source_path: str, width: int, fmt: str, quality: int) -> str:
+        """Return the path of the rendition, rendering it first if it is not cached.
+
+        ``width`` (None for the stored size) and ``quality`` are snapped first.
+        """
+        if self._entries is None:
+            await asyncio.to_thread(self._load)
+        width = self.snap_width(width) if width else None
+        quality = self.snap_quality(quality)
+
+        stem = os.path.splitext(os.path.basename(source_path))[0]
+        filename = f"{stem}_w{width or 0}_q{quality}.{fmt}"
+        path = os.path.join(self.directory, filename)
+
+        with self._lock:
+            if filename in self._entries:
+                self._entries.move_to_end(filename)
+                self._hits += 1
+                return path
+
+        future = self._in_flight.get(filename)
+        if future is None:
+            self._misses += 1
+            future = asyncio.ensure_future(self._render(source_path, path, filename, width, fmt, quality))
+            self._in_flight[filename] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(filename, None))
+        await asyncio.shield(future)
+        return path
+
+    async def open(self, source_path: str, width: int, fmt: str, quality: int):
+        """Open the rendition for reading, rendering it first if it is not cached.
+
+        The file is opened in the same event loop step that ``get`` returns in,
+        before any render can evict it; an eviction after that unlinks the
+        file without affecting the open handle.
+        """
+        while True:
+            path = await self.get(source_path, width, fmt, quality)
+            try:
+                return open(path, "rb")
+            except FileNotFoundError:
+                # Removed behind the cache's back; render it again
+                with self._lock:
+                    self._bytes -= self._entries.pop(os.path.basename(path), 0)
+
+    async def _render(self, source_path: str, path: str, filename: str, width: int, fmt: str, quality: int):
+        loop = asyncio.get_running_loop()
+        async with self._render_slots:
+            size = await loop.run_in_executor(
+                get_image_pool(), render_rendition, source_path, path, width, fmt, quality
+            )
+        self._add(filename, size)
+        logger.info("Rendered %s (%d bytes)", filename, size)
+
+    def default_quality(self, fmt: str) -> int:
+        return _SAVE_OPTIONS[fmt]["quality"]
+
+    def stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "entries": len(self._entries or ()),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "widths": self.widths,
+            "qualities": self.qualities,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "rendering": len(self._in_flight),
+        }
+
+
+rendition_cache = RenditionCache.from_env()
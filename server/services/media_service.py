@@ -1,23 +1,96 @@
-import io
+import asyncio
+import glob
+import hashlib
 import os
-from typing import Dict
+import multiprocessing
+import tempfile
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
 import logging
-import uuid
+from datetime import datetime
 from fastapi import UploadFile, HTTPException
-from PIL import Image
+from pymongo import ReturnDocument
+from server.services.image_workers import ImageTooLarge, encode_variants
 
 logger = logging.getLogger(__name__)
 
+_image_pool = None
+
+def get_image_pool() -> ProcessPoolExecutor:
+    """Process pool for CPU-heavy image decoding/encoding, sized to the cores."""
+    global _image_pool
+    if _image_pool is None:
+        workers = int(os.getenv("MEDIA_WORKERS", str(os.cpu_count() or 1)))
+        # Spawn rather than fork: the server process already runs Mongo and AI threads
+        _image_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _image_pool
+
+def shutdown_image_pool():
+    global _image_pool
+    if _image_pool is not None:
+        _image_pool.shutdown(wait=False, cancel_futures=True)
+        _image_pool = None
+
+# Responsive variants written next to every upload: widths in pixels ("original"
+# keeps the source size) and output formats
+VARIANT_WIDTHS = [w.strip() for w in os.getenv("MEDIA_VARIANT_WIDTHS", "320,640,1280,original").split(",") if w.strip()]
+VARIANT_FORMATS = [f.strip().lower() for f in os.getenv("MEDIA_VARIANT_FORMATS", "webp,avif").split(",") if f.strip()]
+
+# Upload limits: raw bytes accepted, decoded pixels accepted, and the longest
+# side kept after decoding (larger images are downscaled while decoding)
+MAX_UPLOAD_BYTES = int(os.getenv("MEDIA_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+MAX_PIXELS = int(os.getenv("MEDIA_MAX_PIXELS", str(50_000_000)))
+MAX_DIMENSION = int(os.getenv("MEDIA_MAX_DIMENSION", "2560"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Media root as seen by the frontend; image paths stored in Mongo start with it
+PUBLIC_MEDIA_ROOT = '/mnt/media_storage/mindofshaun/projects'
+
+def media_root() -> str:
+    """Directory holding project media; uploaded images live in its ``projects`` subdirectory."""
+    if os.getenv("LOCAL_DEV", "false").lower() in ("true"):
+        return os.path.join(os.getcwd(), 'public' + PUBLIC_MEDIA_ROOT)
+    return PUBLIC_MEDIA_ROOT
+
+def public_media_path(filename: str) -> str:
+    """Path stored in project documents for an uploaded file"""
+    return f"{PUBLIC_MEDIA_ROOT}/projects/{filename}"
+
+# Per-image locks, keyed by the content-hash stem, with a count of holders and waiters
+_digest_locks = {}
+
+@asynccontextmanager
+async def _digest_lock(stem: str):
+    """Serialize uploads and deletions of the same image within this process"""
+    entry = _digest_locks.setdefault(stem, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _digest_locks[stem]
+
 class MediaService:
     @staticmethod
-    async def upload_project_image(file: UploadFile) -> Dict[str, str]:
+    async def upload_project_image(file: UploadFile, media_collection=None) -> Dict:
         """Upload a project image and return its details
         
+        Images are stored under the SHA-256 of their bytes. When
+        ``media_collection`` is given, uploading bytes that are already stored
+        only increments the stored image's reference count and returns it,
+        without decoding or writing anything.
+        
         Args:
             file: The uploaded file object
+            media_collection: Optional collection of reference-counted media
             
         Returns:
-            Dict with filename and relative path information
+            Dict with filename and relative path information, plus the
+            responsive variants (path, format, dimensions, bytes) by
+            "<width>.<format>"
         """
 
         try:
@@ -26,52 +99,160 @@ class MediaService:
                 raise HTTPException(status_code=400, detail="No file provided")
                 
             # Define base path for media storage
-            is_local = os.getenv("LOCAL_DEV", "false").lower() in ("true")
-            
-            base_path = '/mnt/media_storage/mindofshaun/projects' if not is_local else os.path.join(os.getcwd(), 'public/mnt/media_storage/mindofshaun/projects')
+            base_path = media_root()
             logger.info("Using storage base path: %s", base_path)
             
             # Create projects directory if it doesn't exist
             projects_dir = os.path.join(base_path, "projects")
             os.makedirs(projects_dir, exist_ok=True)
             
-            # Read the file content
-            contents = await file.read()
-            
-            # Open the image using PIL
-            original_img = Image.open(io.BytesIO(contents))
-            
-            # Convert to RGB if needed (WebP doesn't support RGBA in some cases)
-            if original_img.mode == 'RGBA':
-                original_img = original_img.convert('RGBA')
-            else:
-                original_img = original_img.convert('RGB')
-            
-            # Generate a unique filename with .webp extension
+            # Stream the upload to disk instead of holding it in memory
+            source_path, size, digest = await MediaService._spool_upload(file)
             original_filename = file.filename or "unnamed_file"
-            unique_filename = f"{uuid.uuid4()}.webp"
-            file_path = os.path.join(projects_dir, unique_filename)
-            
-            logger.info("Converting and saving file %s as %s", original_filename, unique_filename)
-            
-            # Save as WebP with good quality (85%)
-            original_img.save(file_path, "WEBP", quality=85, method=6)
-            logger.info("File converted and saved successfully. Relative path: %s", f'{base_path}/projects/{unique_filename}')
-
-            if is_local:
-                base_path = '/' + base_path.split('public/')[1]
             
-            return {"filename": unique_filename, "path": f"{base_path}/projects/{unique_filename}"}
+            # One upload or deletion of the same image at a time: a concurrent
+            # identical upload waits here, then reuses what this one stored
+            async with _digest_lock(digest[:32]):
+                return await MediaService._store_upload(
+                    source_path, size, digest, original_filename, projects_dir, media_collection
+                )
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error("Failed to upload file: %s", str(e))
             raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(e)}")
     
     @staticmethod
-    async def delete_project_image(file_path: str) -> bool:
-        """Delete a project image file
+    async def _store_upload(source_path: str, size: int, digest: str, original_filename: str,
+                            projects_dir: str, media_collection=None) -> Dict:
+        """Reuse or encode a spooled upload; the caller holds the digest's lock"""
+        # Identical bytes were uploaded before: reuse the stored image
+        if media_collection is not None:
+            existing = await media_collection.find_one_and_update(
+                {"_id": digest},
+                # last_referenced tells the media sweeper this file is about to be used again
+                {"$inc": {"refcount": 1}, "$set": {"last_referenced": datetime.utcnow()}},
+                projection={"filename": 1, "path": 1, "variants": 1},
+            )
+            if existing and os.path.exists(os.path.join(projects_dir, existing["filename"])):
+                os.remove(source_path)
+                logger.info("Upload %s matches stored image %s", original_filename, existing["path"])
+                return {"filename": existing["filename"], "path": existing["path"], "variants": existing["variants"]}
+            if existing:
+                # Its files were removed by a release still finishing; write them again below
+                logger.warning("Stored image %s is missing its files, encoding it again", existing["path"])
+        else:
+            existing = None
+
+        # Name the files after the content hash so identical uploads share a name
+        stem = digest[:32]
+        unique_filename = f"{stem}.webp"
+
+        logger.info("Converting and saving file %s as %s", original_filename, unique_filename)
+
+        # Decode and encode every variant in the process pool so the event loop stays free
+        loop = asyncio.get_running_loop()
+        try:
+            variants, memory = await loop.run_in_executor(
+                get_image_pool(), encode_variants, source_path, projects_dir, stem, VARIANT_WIDTHS, VARIANT_FORMATS,
+                MAX_PIXELS, MAX_DIMENSION,
+            )
+        except ImageTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        finally:
+            os.remove(source_path)
+        logger.info("File converted and saved successfully. Relative path: %s", f'{projects_dir}/{unique_filename}')
+        logger.info(
+            "Upload %s: %d bytes, %dx%d decoded at %dx%d (%.1f MB bitmap), worker peak RSS %s KiB (+%s KiB)",
+            original_filename, size, *memory["source_size"], *memory["decoded_size"],
+            memory["decoded_bytes"] / 1e6, memory["call_peak_rss_kb"], memory["call_peak_growth_kb"],
+        )
+
+        for variant in variants.values():
+            variant["path"] = public_media_path(variant.pop('filename'))
+
+        result = {"filename": unique_filename, "path": public_media_path(unique_filename), "variants": variants}
+        if media_collection is not None and not existing:
+            # Another process may have stored the same bytes meanwhile; both share one document
+            await media_collection.update_one(
+                {"_id": digest},
+                {
+                    "$setOnInsert": {**result, "bytes": size, "created_at": datetime.utcnow()},
+                    "$set": {"last_referenced": datetime.utcnow()},
+                    "$inc": {"refcount": 1},
+                },
+                upsert=True,
+            )
+        return result
+    
+    @staticmethod
+    async def _spool_upload(file: UploadFile):
+        """Copy an upload to a temporary file in chunks, enforcing the size limit
+        
+        Returns:
+            Tuple of the temporary file path, its size in bytes and the
+            SHA-256 hex digest of its contents
+        """
+        size = 0
+        digest = hashlib.sha256()
+        tmp = tempfile.NamedTemporaryFile(prefix="upload_", delete=False)
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB upload limit"
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(tmp.write, chunk)
+            tmp.close()
+            return tmp.name, size, digest.hexdigest()
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    
+    @staticmethod
+    async def upload_project_images(files: List[UploadFile], media_collection=None) -> List[Dict]:
+        """Upload several project images concurrently
+        
+        Args:
+            files: The uploaded file objects
+            media_collection: Optional collection of reference-counted media
+            
+        Returns:
+            List of upload results, in the same order as ``files``
+
+        If any upload fails, the ones that succeeded are released again and
+        the first error is raised, so a failed request leaves no references.
+        """
+        results = await asyncio.gather(
+            *(MediaService.upload_project_image(file, media_collection) for file in files),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            await MediaService.release_project_images(
+                [result["path"] for result in results if not isinstance(result, BaseException)],
+                media_collection,
+            )
+            raise errors[0]
+        return results
+
+    @staticmethod
+    async def release_project_images(file_paths: List[str], media_collection=None):
+        """Release images uploaded by a request that then failed"""
+        for file_path in file_paths:
+            await MediaService.delete_project_image(file_path, media_collection)
+    
+    @staticmethod
+    async def delete_project_image(file_path: str, media_collection=None) -> bool:
+        """Release a project image, deleting its files once nothing references it
         
         Args:
             file_path: The path to the file to delete
+            media_collection: Optional collection of reference-counted media
             
         Returns:
             Boolean indicating success or failure
@@ -81,30 +262,46 @@ class MediaService:
                 logger.warning("No file path provided for deletion")
                 return False
             
-            # Determine if we're in local or production environment
-            is_local = os.getenv("LOCAL_DEV", "false").lower() in ("true")
-            
             # Get the filename from the path
             filename = file_path.split('/')[-1]
             
-            # Determine the actual file path on disk
-            if is_local:
-                # For local development, adjust the path
-                actual_path = os.path.join(os.getcwd(), 'public/mnt/media_storage/dn_right/projects', filename)
-            else:
-                # For production
-                actual_path = os.path.join('/mnt/media_storage/dn_right/projects', filename)
-            
-            logger.info("Attempting to delete file at: %s", actual_path)
+            # Uploads are written to the projects directory under the media root
+            actual_path = os.path.join(media_root(), "projects", filename)
+            stem = os.path.splitext(actual_path)[0]
             
-            # Check if file exists before deleting
-            if os.path.exists(actual_path):
-                os.remove(actual_path)
-                logger.info("Successfully deleted file: %s", filename)
-                return True
-            else:
-                logger.warning("File not found for deletion: %s", actual_path)
-                return False
+            # Held until the media document is gone, so an identical upload
+            # cannot reuse it while its files are being removed
+            async with _digest_lock(os.path.basename(stem)):
+                media = None
+                if media_collection is not None:
+                    media = await media_collection.find_one_and_update(
+                        {"path": file_path},
+                        {"$inc": {"refcount": -1}},
+                        return_document=ReturnDocument.AFTER,
+                    )
+                    if media and media["refcount"] > 0:
+                        logger.info("Image %s still has %d references, keeping files", file_path, media["refcount"])
+                        return True
+                
+                logger.info("Attempting to delete file at: %s", actual_path)
+                
+                # Remove the files before the media document, so a document never
+                # outlives its files unnoticed: uploads re-encode when they are missing
+                if os.path.exists(actual_path):
+                    os.remove(actual_path)
+                    logger.info("Successfully deleted file: %s", filename)
+                    
+                    # Remove the responsive variants written alongside it
+                    for variant_path in glob.glob(f"{glob.escape(stem)}_*.*") + glob.glob(f"{glob.escape(stem)}.avif"):
+                        os.remove(variant_path)
+                    deleted_files = True
+                else:
+                    logger.warning("File not found for deletion: %s", actual_path)
+                    deleted_files = False
+                
+                if media:
+                    await media_collection.delete_one({"_id": media["_id"], "refcount": {"$lte": 0}})
+                return deleted_files
                 
         except Exception as e:
             logger.error("Failed to delete file %s: %s", file_path, str(e))
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from server.services.media_service import media_root, public_media_path
+
+logger = logging.getLogger(__name__)
+
+
+def _stem(filename: str) -> str:
+    """Stem shared by an upload and its variants (``<stem>.webp``, ``<stem>_<width>.<format>``)."""
+    stem = os.path.splitext(filename)[0]
+    base, _, width = stem.rpartition("_")
+    return base if base and width.isdigit() else stem
+
+
+class MediaSweeper:
+    """Finds uploaded images that no project references and removes them.
+
+    The projects media directory is streamed in batches; every batch is
+    checked against the projects collection with a single ``$in`` query on
+    ``images.image``, so neither the directory listing nor the collection is
+    ever held in memory. Files younger than the grace period are left alone
+    because the project that uploaded them may not be saved yet. Nor are
+    files whose media record was referenced within the grace period, since a
+    deduplicated upload reuses an old file before its project is saved; each
+    batch's orphans are re-checked just before removal. Orphans are moved to a
+    quarantine directory, or deleted when ``action`` is "delete".
+    """
+
+    def __init__(self, grace_seconds: int, batch_size: int, interval: int, action: str):
+        self.grace_seconds = grace_seconds
+        self.batch_size = batch_size
+        self.interval = interval
+        self.action = action
+        self.last_report = None
+        self._db = None
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            grace_seconds=int(os.getenv("MEDIA_SWEEP_GRACE", str(24 * 3600))),
+            batch_size=int(os.getenv("MEDIA_SWEEP_BATCH", "500")),
+            interval=int(os.getenv("MEDIA_SWEEP_INTERVAL", str(6 * 3600))),
+            action=os.getenv("MEDIA_SWEEP_ACTION", "quarantine"),
+        )
+
+    def start(self, db):
+        """Attach to ``db`` and sweep every ``interval`` seconds (0 disables the background sweep)."""
+        self._db = db
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Media sweep failed: {str(e)}")
+
+    async def sweep(self, dry_run: bool = False) -> dict:
+        """Remove orphaned media and return counts and reclaimed bytes."""
+        async with self._lock:
+            return await self._sweep(dry_run)
+
+    async def _sweep(self, dry_run: bool) -> dict:
+        started = time.perf_counter()
+        directory = os.path.join(media_root(), "projects")
+        quarantine_dir = os.path.join(media_root(), "quarantine")
+        cutoff = time.time() - self.grace_seconds
+        referenced_cutoff = datetime.utcnow() - timedelta(seconds=self.grace_seconds)
+        report = {"action": "none" if dry_run else self.action, "scanned_files": 0, "batches": 0,
+                  "orphaned_files": 0, "reclaimed_bytes": 0}
+
+        if not os.path.isdir(directory):
+            report["seconds"] = time.perf_counter() - started
+            return report
+
+        entries = await asyncio.to_thread(os.scandir, directory)
+        try:
+            while batch := await asyncio.to_thread(self._next_batch, entries):
+                report["batches"] += 1
+                report["scanned_files"] += len(batch)
+
+                candidates = {public_media_path(f"{_stem(name)}.webp") for name, _, mtime in batch if mtime < cutoff}
+                if not candidates:
+                    continue
+                orphaned_paths = candidates - await self._referenced(candidates, referenced_cutoff)
+                orphans = [
+                    (name, size) for name, size, mtime in batch
+                    if mtime < cutoff and public_media_path(f"{_stem(name)}.webp") in orphaned_paths
+                ]
+                if not orphans:
+                    continue
+
+                report["orphaned_files"] += len(orphans)
+                report["reclaimed_bytes"] += sum(size for _, size in orphans)
+                if dry_run:
+                    continue
+                await asyncio.to_thread(self._remove, directory, quarantine_dir, [name for name, _ in orphans])
+                await self._db.media.delete_many({
+                    "path": {"$in": list(orphaned_paths)},
+                    "$or": [{"last_referenced": {"$lt": referenced_cutoff}}, {"last_referenced": {"$exists": False}}],
+                })
+        finally:
+            entries.close()
+
+        report["seconds"] = time.perf_counter() - started
+        logger.info(
+            "Media sweep: %d files scanned, %d orphaned, %.1f MB reclaimed (%s)",
+            report["scanned_files"], report["orphaned_files"], report["reclaimed_bytes"] / 1e6, report["action"],
+        )
+        if not dry_run:
+            self.last_report = report
+        return report
+
+    async def _referenced(self, paths: set, referenced_cutoff: datetime) -> set:
+        """Those of ``paths`` that a project uses or whose media record was referenced since the cutoff.
+
+        Projects are queried last, so an upload that reused a file just before
+        the media check is caught by one query or the other.
+        """
+        paths = list(paths)
+        referenced = set(await self._db.media.distinct(
+            "path", {"path": {"$in": paths}, "last_referenced": {"$gte": referenced_cutoff}}
+        ))
+        referenced.update(await self._db.projects.distinct("images.image", {"images.image": {"$in": paths}}))
+        return referenced
+
+    def _next_batch(self, entries) -> list:
+        batch = []
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            batch.append((entry.name, stat.st_size, stat.st_mtime))
+            if len(batch) >= self.batch_size:
+                break
+        return batch
+
+    def _remove(self, directory: str, quarantine_dir: str, filenames: list):
+        if self.action != "delete":
+            os.makedirs(quarantine_dir, exist_ok=True)
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            try:
+                if self.action == "delete":
+                    os.remove(path)
+                else:
+                    os.replace(path, os.path.join(quarantine_dir, filename))
+            except FileNotFoundError:
+                pass
+
+
+media_sweeper = MediaSweeper.from_env()
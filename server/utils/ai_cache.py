@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+import dspy
+
+logger = logging.getLogger(__name__)
+
+
+def uses_signatures(*signatures):
+    """Record which DSPy signatures an AI tool function calls.
+
+    The signatures are folded into the cache key so that changing a signature's
+    fields, descriptions or instructions invalidates previously cached results.
+    """
+    def decorator(fn):
+        fn.signatures = signatures
+        return fn
+    return decorator
+
+
+def _signature_fingerprint(signature):
+    if isinstance(signature, str):
+        return signature
+
+    fields = {}
+    for name, field in signature.fields.items():
+        extra = field.json_schema_extra or {}
+        fields[name] = {
+            "annotation": repr(field.annotation),
+            "desc": extra.get("desc"),
+            "prefix": extra.get("prefix"),
+        }
+    return {
+        "name": signature.__name__,
+        "instructions": signature.instructions,
+        "fields": fields,
+    }
+
+
+def _lm_fingerprint():
+    lm = dspy.settings.lm
+    if lm is None:
+        return None
+    return {"model": getattr(lm, "model", repr(lm)), "kwargs": getattr(lm, "kwargs", {})}
+
+
+class AICache:
+    """Two-tier cache for AI tool results.
+
+    Results are keyed by a hash of the tool, the signatures it uses, its inputs
+    and the configured LM. An in-process LRU bounded by serialized size sits in
+    front of a Mongo collection whose documents expire through a TTL index.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: int, collection_name: str = "ai_cache"):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.collection_name = collection_name
+        # Extra key component, e.g. the fingerprint of the loaded compiled programs
+        self.namespace = None
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._collection = None
+        self._counters = defaultdict(lambda: {"memory_hits": 0, "mongo_hits": 0, "misses": 0})
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_bytes=int(os.getenv("AI_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+            ttl_seconds=int(os.getenv("AI_CACHE_TTL", str(7 * 24 * 3600))),
+        )
+
+    async def attach(self, db):
+        """Use ``db`` for the persistent tier; its TTL index is in the index registry."""
+        self._collection = db[self.collection_name]
+
+    def make_key(self, fn, inputs: dict) -> str:
+        payload = {
+            "tool": fn.__name__,
+            "signatures": [_signature_fingerprint(s) for s in getattr(fn, "signatures", ())],
+            "inputs": inputs,
+            "lm": _lm_fingerprint(),
+            "namespace": self.namespace,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _remember(self, key: str, encoded: str):
+        size = len(encoded)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key))
+        self._entries[key] = encoded
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    async def get(self, key: str, tool: str):
+        """Return the cached result for ``key`` or None on a miss."""
+        counters = self._counters[tool]
+        encoded = self._entries.get(key)
+        if encoded is not None:
+            self._entries.move_to_end(key)
+            counters["memory_hits"] += 1
+            return json.loads(encoded)
+
+        if self._collection is not None:
+            try:
+                doc = await self._collection.find_one({"_id": key})
+            except Exception as e:
+                logger.warning(f"AI cache lookup failed: {str(e)}")
+                doc = None
+            # The TTL monitor only runs once a minute, so check expiry ourselves too
+            expires_before = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+            if doc and doc["created_at"] > expires_before:
+                counters["mongo_hits"] += 1
+                self._remember(key, doc["value"])
+                return json.loads(doc["value"])
+
+        counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, tool: str, value):
+        encoded = json.dumps(value, default=str)
+        self._remember(key, encoded)
+        if self._collection is None:
+            return
+        try:
+            await self._collection.update_one(
+                {"_id": key},
+                {"$set": {"tool": tool, "value": encoded, "created_at": datetime.utcnow()}},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"AI cache write failed: {str(e)}")
+
+    def stats(self) -> dict:
+        tools = {}
+        for tool, counters in self._counters.items():
+            hits = counters["memory_hits"] + counters["mongo_hits"]
+            total = hits + counters["misses"]
+            tools[tool] = {**counters, "hit_ratio": hits / total if total else 0.0}
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "tools": tools,
+        }
+
+
+ai_cache = AICache.from_env()
@@ -0,0 +1,154 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+class AIExecutor:
+    """Runs blocking DSPy/LLM calls on a dedicated thread pool.
+
+    A global concurrency cap limits how many AI calls run at once. Callers
+    beyond the cap wait in a bounded queue; when the queue is full the request
+    is rejected with a 429, and when a caller waits longer than
+    ``queue_timeout`` seconds it is rejected with a 503.
+    """
+
+    def __init__(self, max_workers: int, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_workers = max_workers
+        self.max_concurrency = min(max_concurrency, max_workers)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-worker")
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self._waiting = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected_queue_full = 0
+        self._rejected_timeout = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+        self._run_max = 0.0
+
+    @classmethod
+    def from_env(cls):
+        max_workers = int(os.getenv("AI_EXECUTOR_WORKERS", "8"))
+        return cls(
+            max_workers=max_workers,
+            max_concurrency=int(os.getenv("AI_MAX_CONCURRENCY", str(max_workers))),
+            max_queue=int(os.getenv("AI_MAX_QUEUE", "32")),
+            queue_timeout=float(os.getenv("AI_QUEUE_TIMEOUT", "30")),
+        )
+
+    async def _acquire(self) -> float:
+        """Wait for a free slot and return the time spent waiting."""
+        # Counted before any await: semaphore.locked() lags behind a burst of callers
+        # whose acquire() has not run yet, so it cannot enforce the queue bound
+        if self._running + self._waiting >= self.max_concurrency + self.max_queue:
+            self._rejected_queue_full += 1
+            logger.warning("AI queue full (%d waiting, %d running), rejecting request", self._waiting, self._running)
+            raise HTTPException(
+                status_code=429,
+                detail="Too many AI requests queued, please retry shortly",
+                headers={"Retry-After": "5"},
+            )
+
+        self._waiting += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected_timeout += 1
+            logger.warning("Timed out after %.1fs waiting for an AI worker", self.queue_timeout)
+            raise HTTPException(
+                status_code=503,
+                detail="AI workers are busy, please retry shortly",
+                headers={"Retry-After": "10"},
+            )
+        finally:
+            self._waiting -= 1
+
+        waited = time.perf_counter() - start
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        self._running += 1
+        return waited
+
+    def _release(self, started: float, failed: bool):
+        elapsed = time.perf_counter() - started
+        self._run_total += elapsed
+        self._run_max = max(self._run_max, elapsed)
+        self._running -= 1
+        if failed:
+            self._failed += 1
+        else:
+            self._completed += 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one concurrency slot for work that runs on the event loop itself."""
+        await self._acquire()
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._release(started, failed)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on the AI thread pool without blocking the event loop."""
+        await self._acquire()
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        try:
+            future = loop.run_in_executor(self._pool, functools.partial(ctx.run, fn, *args, **kwargs))
+        except BaseException:
+            self._release(started, failed=True)
+            raise
+
+        # The slot is released when the thread actually finishes, so a client that
+        # disconnects mid-call cannot push us over the concurrency cap.
+        future.add_done_callback(
+            lambda f: self._release(started, failed=f.cancelled() or f.exception() is not None)
+        )
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        finished = self._completed + self._failed
+        admitted = finished + self._running
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "queue_depth": self._waiting,
+            "running": self._running,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected_queue_full": self._rejected_queue_full,
+            "rejected_timeout": self._rejected_timeout,
+            "avg_wait_seconds": self._wait_total / admitted if admitted else 0.0,
+            "max_wait_seconds": self._wait_max,
+            "avg_run_seconds": self._run_total / finished if finished else 0.0,
+            "max_run_seconds": self._run_max,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+ai_executor = AIExecutor.from_env()
@@ -1,23 +1,123 @@
+import asyncio
+import inspect
 import logging
+import time
 from fastapi import HTTPException
 
 from bson import ObjectId
+from server.utils.ai_executor import ai_executor
+from server.utils.ai_cache import ai_cache
+from server.utils.response_cache import response_cache
+from server.services.SocketClient import socket_client
 
 logger = logging.getLogger(__name__)
 
-async def save_ai_result(collection, post_id: str, result_key: str, result_value) -> bool:
+# Cache key -> future for AI calls currently running, so identical concurrent
+# requests (double clicks, two tabs) share one LLM call
+_in_flight = {}
+
+async def save_ai_results(collection, post_id: str, results: dict, sections: dict = None) -> bool:
+    """Save several ``ai_results`` entries on a post in a single write.
+
+    ``sections`` optionally maps result keys to the section hashes each result
+    was built from; they are stored under ``ai_sections``. Results saved
+    without hashes drop any earlier ones, which no longer describe them.
+    """
     if not ObjectId.is_valid(post_id):
         logger.error(f"Invalid post ID format: {post_id}")
         return False
 
-    update_field = f"ai_results.{result_key}"
-    result = await collection.update_one(
-        {"_id": ObjectId(post_id)},
-        {"$set": {update_field: result_value}}
-    )
+    sections = sections or {}
+    update_fields = {f"ai_results.{key}": value for key, value in results.items()}
+    stale_sections = {}
+    for key in results:
+        if sections.get(key) is not None:
+            update_fields[f"ai_sections.{key}"] = sections[key]
+        else:
+            stale_sections[f"ai_sections.{key}"] = ""
+    update = {"$set": update_fields}
+    if stale_sections:
+        update["$unset"] = stale_sections
+    result = await collection.update_one({"_id": ObjectId(post_id)}, update)
+    # Post responses include ai_results
+    response_cache.invalidate("posts", f"post:{post_id}")
     return result.matched_count > 0
 
 
+async def save_ai_result(collection, post_id: str, result_key: str, result_value, section_hashes: list = None) -> bool:
+    sections = {result_key: section_hashes} if section_hashes is not None else None
+    return await save_ai_results(collection, post_id, {result_key: result_value}, sections)
+
+
+def sections_of(fn, inputs: dict):
+    """Section hashes a section-aware tool's result covers, or None for other tools."""
+    if not hasattr(fn, "sections_of"):
+        return None
+    return fn.sections_of(inputs)
+
+
+async def run_ai_tool(fn, *, result_key: str = None, socket_id: str = None, **inputs):
+    """Run an AI tool through the result cache and the AI executor.
+
+    When ``socket_id`` is given and the tool supports streaming, partial output
+    is emitted to that Socket.IO client as ``ai_stream_chunk`` events.
+    Exceptions propagate unchanged.
+    """
+    cache_key = ai_cache.make_key(fn, inputs)
+    result = await ai_cache.get(cache_key, tool=fn.__name__)
+    if result is not None:
+        return result
+
+    while (shared := _in_flight.get(cache_key)) is not None:
+        logger.info(f"Joining in-flight AI call for {fn.__name__}")
+        try:
+            return await asyncio.shield(shared)
+        except asyncio.CancelledError:
+            # Only the owner was cancelled (e.g. its client went away): join or run the call afresh
+            if not shared.cancelled() or asyncio.current_task().cancelling():
+                raise
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[cache_key] = future
+    try:
+        result = await _call_ai_tool(fn, cache_key, result_key=result_key, socket_id=socket_id, **inputs)
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Nobody may be waiting on the shared future; don't warn about it
+        future.exception()
+        raise
+    finally:
+        del _in_flight[cache_key]
+
+
+async def _call_ai_tool(fn, cache_key: str, *, result_key: str = None, socket_id: str = None, **inputs):
+    if socket_id and hasattr(fn, "stream"):
+        async def emit_chunk(field, chunk):
+            await socket_client.emit(
+                "ai_stream_chunk",
+                {"result_key": result_key, "field": field, "chunk": chunk},
+                to=socket_id,
+            )
+
+        async with ai_executor.slot():
+            result = await fn.stream(emit_chunk, **inputs)
+    elif inspect.iscoroutinefunction(fn):
+        # Async tools schedule their own predictor calls on the executor
+        result = await fn(**inputs)
+    else:
+        result = await ai_executor.run(fn, **inputs)  # <- Flexible argument passing, off the event loop
+
+    # Don't pin a partially failed result in the cache
+    if not (isinstance(result, dict) and result.get("failed_steps")):
+        await ai_cache.set(cache_key, tool=fn.__name__, value=result)
+    return result
+
+
 async def try_process_ai_request(
     fn,
     *,
@@ -25,17 +125,87 @@ async def try_process_ai_request(
     collection,
     post_id: str = None,
     save: bool = True,
+    socket_id: str = None,
+    job_queue=None,
     **inputs
 ):
+    """Run an AI tool and optionally save its result on the post.
+
+    When streaming to ``socket_id``, ``ai_stream_done`` (with the full result)
+    or ``ai_stream_error`` is emitted once the tool finishes. When a
+    ``job_queue`` is given, the request is queued there instead and the job id
+    is returned right away.
+    """
+    if job_queue is not None:
+        logger.info(f"Queueing AI job for post {post_id} with key {result_key}")
+        return await job_queue.submit(
+            fn, result_key=result_key, post_id=post_id, save=save, socket_id=socket_id, **inputs
+        )
+
+    streaming = bool(socket_id) and hasattr(fn, "stream")
     try:
         logger.info(f"Processing AI request for post {post_id} with key {result_key}")
-        result = fn(**inputs)  # <- Flexible argument passing
+        result = await run_ai_tool(fn, result_key=result_key, socket_id=socket_id, **inputs)
 
         if save and post_id:
             logger.info(f"Saving AI result for post {post_id} with key {result_key}")
-            await save_ai_result(collection, post_id, result_key, result)
+            await save_ai_result(collection, post_id, result_key, result, sections_of(fn, inputs))
+
+        if streaming:
+            await socket_client.emit("ai_stream_done", {"result_key": result_key, "result": result}, to=socket_id)
 
         return result
+    except HTTPException as e:
+        if streaming:
+            await socket_client.emit("ai_stream_error", {"result_key": result_key, "error": e.detail}, to=socket_id)
+        raise
     except Exception as e:
         logger.error(f"Error processing AI: {str(e)}")
+        if streaming:
+            await socket_client.emit("ai_stream_error", {"result_key": result_key, "error": str(e)}, to=socket_id)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+async def try_process_ai_batch(
+    tools: dict,
+    *,
+    collection,
+    post_id: str = None,
+    save: bool = True,
+):
+    """Run several AI tools concurrently and save their results in one write.
+
+    ``tools`` maps a tool name to ``(fn, result_key, inputs)``. Each tool still
+    goes through the result cache and the AI executor's concurrency limit.
+    Returns per-tool status, result or error, and seconds taken.
+    """
+    async def run_one(name, fn, result_key, inputs):
+        started = time.perf_counter()
+        try:
+            result = await run_ai_tool(fn, result_key=result_key, **inputs)
+            outcome = {"status": "ok", "result_key": result_key, "result": result}
+        except HTTPException as e:
+            outcome = {"status": "error", "result_key": result_key, "error": e.detail}
+        except Exception as e:
+            logger.error(f"Error processing AI tool {name} in batch: {str(e)}")
+            outcome = {"status": "error", "result_key": result_key, "error": str(e)}
+        outcome["seconds"] = round(time.perf_counter() - started, 3)
+        return name, outcome
+
+    logger.info(f"Processing AI batch for post {post_id}: {', '.join(tools)}")
+    started = time.perf_counter()
+    outcomes = dict(await asyncio.gather(
+        *(run_one(name, fn, result_key, inputs) for name, (fn, result_key, inputs) in tools.items())
+    ))
+
+    succeeded = {o["result_key"]: o["result"] for o in outcomes.values() if o["status"] == "ok"}
+    sections = {}
+    for name, (fn, result_key, inputs) in tools.items():
+        hashes = sections_of(fn, inputs)
+        if hashes is not None and result_key in succeeded:
+            sections[result_key] = hashes
+    if save and post_id and succeeded:
+        logger.info(f"Saving {len(succeeded)} AI results for post {post_id}")
+        await save_ai_results(collection, post_id, succeeded, sections)
+
+    return {"tools": outcomes, "seconds": round(time.perf_counter() - started, 3)}
@@ -0,0 +1,129 @@
+import bisect
+import os
+import threading
+from collections import defaultdict
+
+# Latency buckets (seconds) sized for LLM round-trips
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+# USD per million tokens, defaulting to gpt-4o-mini pricing
+PROMPT_PRICE_PER_MTOK = float(os.getenv("AI_PROMPT_PRICE_PER_MTOK", "0.15"))
+COMPLETION_PRICE_PER_MTOK = float(os.getenv("AI_COMPLETION_PRICE_PER_MTOK", "0.60"))
+
+
+class _SignatureStats:
+    __slots__ = ("bucket_counts", "latency_sum", "calls", "errors", "prompt_tokens", "completion_tokens")
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+
+class AIMetrics:
+    """Per-signature latency, token, error and cost counters for predictor calls.
+
+    Recording is a lock plus a few integer updates, so it is cheap enough to do
+    on every call. ``render`` produces the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signatures = defaultdict(_SignatureStats)
+
+    def record(self, signature: str, seconds: float, usage: dict = None, error: bool = False):
+        prompt_tokens = completion_tokens = 0
+        for model_usage in (usage or {}).values():
+            prompt_tokens += model_usage.get("prompt_tokens") or 0
+            completion_tokens += model_usage.get("completion_tokens") or 0
+
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            stats = self._signatures[signature]
+            stats.bucket_counts[bucket] += 1
+            stats.latency_sum += seconds
+            stats.calls += 1
+            stats.errors += error
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+
+    def render(self, cache_stats: dict = None, executor_stats: dict = None,
+               response_cache_stats: dict = None) -> str:
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            snapshot = {
+                name: (list(s.bucket_counts), s.latency_sum, s.calls, s.errors, s.prompt_tokens, s.completion_tokens)
+                for name, s in self._signatures.items()
+            }
+
+        family("ai_predictor_latency_seconds", "histogram", "Latency of DSPy predictor calls")
+        for name, (buckets, latency_sum, calls, *_rest) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, buckets):
+                cumulative += count
+                lines.append(f'ai_predictor_latency_seconds_bucket{{signature="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'ai_predictor_latency_seconds_bucket{{signature="{name}",le="+Inf"}} {calls}')
+            lines.append(f'ai_predictor_latency_seconds_sum{{signature="{name}"}} {latency_sum}')
+            lines.append(f'ai_predictor_latency_seconds_count{{signature="{name}"}} {calls}')
+
+        counters = (
+            ("ai_predictor_errors_total", "Failed DSPy predictor calls", 3),
+            ("ai_predictor_prompt_tokens_total", "Prompt tokens sent by DSPy predictors", 4),
+            ("ai_predictor_completion_tokens_total", "Completion tokens received by DSPy predictors", 5),
+        )
+        for metric, help_text, index in counters:
+            family(metric, "counter", help_text)
+            for name, values in sorted(snapshot.items()):
+                lines.append(f'{metric}{{signature="{name}"}} {values[index]}')
+
+        family("ai_predictor_cost_usd_total", "counter", "Estimated LLM spend of DSPy predictors")
+        for name, values in sorted(snapshot.items()):
+            cost = (values[4] * PROMPT_PRICE_PER_MTOK + values[5] * COMPLETION_PRICE_PER_MTOK) / 1_000_000
+            lines.append(f'ai_predictor_cost_usd_total{{signature="{name}"}} {cost:.6f}')
+
+        if cache_stats is not None:
+            tools = sorted(cache_stats["tools"].items())
+            family("ai_cache_requests_total", "counter", "AI result cache lookups by outcome")
+            for tool, counters in tools:
+                for outcome in ("memory_hits", "mongo_hits", "misses"):
+                    lines.append(f'ai_cache_requests_total{{tool="{tool}",outcome="{outcome}"}} {counters[outcome]}')
+            family("ai_cache_hit_ratio", "gauge", "Share of AI result cache lookups that hit")
+            for tool, counters in tools:
+                lines.append(f'ai_cache_hit_ratio{{tool="{tool}"}} {counters["hit_ratio"]}')
+            family("ai_cache_bytes", "gauge", "Bytes held by the in-process AI result cache")
+            lines.append(f"ai_cache_bytes {cache_stats['bytes']}")
+
+        if executor_stats is not None:
+            for key in ("completed", "failed", "rejected_queue_full", "rejected_timeout"):
+                family(f"ai_executor_{key}_total", "counter", f"AI executor calls {key.replace('_', ' ')}")
+                lines.append(f"ai_executor_{key}_total {executor_stats[key]}")
+            for key in ("queue_depth", "running", "avg_wait_seconds", "max_wait_seconds",
+                        "avg_run_seconds", "max_run_seconds"):
+                family(f"ai_executor_{key}", "gauge", f"AI executor {key.replace('_', ' ')}")
+                lines.append(f"ai_executor_{key} {executor_stats[key]}")
+
+        if response_cache_stats is not None:
+            family("response_cache_requests_total", "counter", "Public GET response cache lookups by outcome")
+            lines.append(f'response_cache_requests_total{{outcome="hit"}} {response_cache_stats["hits"]}')
+            lines.append(f'response_cache_requests_total{{outcome="miss"}} {response_cache_stats["misses"]}')
+            family("response_cache_not_modified_total", "counter", "Responses answered with 304 Not Modified")
+            lines.append(f"response_cache_not_modified_total {response_cache_stats['not_modified']}")
+            family("response_cache_invalidations_total", "counter", "Cached responses dropped by writes")
+            lines.append(f"response_cache_invalidations_total {response_cache_stats['invalidations']}")
+            family("response_cache_hit_ratio", "gauge", "Share of response cache lookups that hit")
+            lines.append(f"response_cache_hit_ratio {response_cache_stats['hit_ratio']}")
+            family("response_cache_bytes", "gauge", "Bytes held by the response cache")
+            lines.append(f"response_cache_bytes {response_cache_stats['bytes']}")
+
+        return "\n".join(lines) + "\n"
+
+
+ai_metrics = AIMetrics()
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import dspy
+from litellm import ModelResponse
+
+_OUTPUT_FIELDS = re.compile(r"Your output fields are:\n(.*?)(?:\n\n|$)", re.DOTALL)
+_FIELD = re.compile(r"^\d+\. `(\w+)` \(([^)]*)\)", re.MULTILINE)
+
+_WORDS = (
+    "draft readers story idea clarity voice structure example detail argument "
+    "point insight context research section flow paragraph evidence takeaway"
+).split()
+
+
+def parse_latency(spec: str):
+    """Build a latency sampler (seconds) from a spec string.
+
+    Supported specs: ``fixed:S``, ``uniform:LOW,HIGH``, ``normal:MEAN,STD`` and
+    ``lognormal:MU,SIGMA`` (parameters of the underlying normal, in log-seconds).
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class FakeLM(dspy.BaseLM):
+    """Offline stand-in for the OpenAI LM, for load tests and local development.
+
+    It reads the output fields DSPy's chat adapter asks for from the system
+    prompt and answers every one of them in the adapter's format, with
+    ``list[...]`` fields as JSON lists of ``list_items`` strings and other
+    fields as ``text_words`` words of filler text. Each call sleeps for a
+    latency drawn from the configured distribution; the sync path blocks its
+    thread just like a real HTTP call would.
+    """
+
+    def __init__(self, latency: str = "lognormal:0.0,0.5", list_items: int = 5, text_words: int = 60, **kwargs):
+        super().__init__(model="fake/lm", **kwargs)
+        self.latency_spec = latency
+        self._sample_latency = parse_latency(latency)
+        self.list_items = list_items
+        self.text_words = text_words
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency=os.getenv("FAKE_LM_LATENCY", "lognormal:0.0,0.5"),
+            list_items=int(os.getenv("FAKE_LM_LIST_ITEMS", "5")),
+            text_words=int(os.getenv("FAKE_LM_TEXT_WORDS", "60")),
+        )
+
+    def _text(self, words: int) -> str:
+        return " ".join(random.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+    def _value(self, type_name: str) -> str:
+        if type_name.startswith("list"):
+            items = [self._text(max(3, self.text_words // 10)) for _ in range(self.list_items)]
+            return json.dumps(items)
+        if type_name == "bool":
+            return "true"
+        if type_name in ("int", "float"):
+            return "1"
+        return self._text(self.text_words)
+
+    def _respond(self, prompt=None, messages=None) -> ModelResponse:
+        messages = messages or [{"role": "user", "content": prompt or ""}]
+        system = "\n".join(m["content"] for m in messages if m["role"] == "system" and isinstance(m["content"], str))
+        section = _OUTPUT_FIELDS.search(system)
+        fields = _FIELD.findall(section.group(1)) if section else []
+
+        parts = [f"[[ ## {name} ## ]]\n{self._value(type_name)}" for name, type_name in fields]
+        parts.append("[[ ## completed ## ]]")
+        content = "\n\n".join(parts)
+
+        prompt_tokens = sum(len(str(m["content"]).split()) for m in messages)
+        completion_tokens = len(content.split())
+        return ModelResponse(
+            model=self.model,
+            choices=[{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            usage={
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        )
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        time.sleep(self._sample_latency())
+        return self._respond(prompt, messages)
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        await asyncio.sleep(self._sample_latency())
+        return self._respond(prompt, messages)
@@ -0,0 +1,89 @@
+import logging
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+from server.utils.ai_cache import ai_cache
+from server.services.ai_jobs import ai_job_queue
+
+logger = logging.getLogger(__name__)
+
+# Server error codes for an existing index whose name or options differ from the requested one
+_INDEX_CONFLICT_CODES = (85, 86)
+
+
+def index_registry() -> dict:
+    """Every index the app relies on, by collection.
+
+    Each query shape in ``server.utils.query_audit`` must be served by one of
+    these; add the index here when adding a query.
+    """
+    return {
+        "blog_posts": [
+            # Post listing: optional tags/published filters, newest first on (created_at, _id)
+            IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("published", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("tags", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("tags", ASCENDING), ("published", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+            # Full-text search, ranked by field
+            IndexModel(
+                [("title", TEXT), ("tags", TEXT), ("excerpt", TEXT), ("content", TEXT)],
+                name="post_search",
+                weights={"title": 10, "tags": 5, "excerpt": 3, "content": 1},
+                default_language="english",
+            ),
+        ],
+        "admins": [
+            IndexModel([("username", ASCENDING)], unique=True),
+        ],
+        "contact_messages": [
+            IndexModel([("is_read", ASCENDING), ("created_at", DESCENDING)]),
+            IndexModel([("created_at", DESCENDING)]),
+        ],
+        "projects": [
+            # Project listing: optional published filter, newest first on (created_at, _id)
+            IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("project_details.published", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+            # Media sweeper reference checks
+            IndexModel([("images.image", ASCENDING)]),
+        ],
+        "media": [
+            IndexModel([("path", ASCENDING)], unique=True),
+        ],
+        ai_cache.collection_name: [
+            IndexModel([("created_at", ASCENDING)], expireAfterSeconds=ai_cache.ttl_seconds),
+        ],
+        ai_job_queue.collection_name: [
+            # One queued or running job per key, so concurrent submissions join it
+            IndexModel([("key", ASCENDING)], name="key_in_flight", unique=True,
+                       partialFilterExpression={"in_flight": True}),
+            IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+            IndexModel([("finished_at", ASCENDING)], expireAfterSeconds=ai_job_queue.finished_ttl),
+        ],
+    }
+
+
+async def apply_indexes(db, registry: dict = None):
+    """Create the registry's indexes on ``db``. Safe to run on every startup.
+
+    Indexes that already exist are left alone. An index whose options changed
+    (e.g. a new TTL) is dropped and recreated. A collection whose indexes
+    cannot be built is logged and skipped so startup carries on.
+    """
+    for collection_name, models in (registry or index_registry()).items():
+        collection = db[collection_name]
+        for model in models:
+            try:
+                await _create_index(collection, model)
+            except OperationFailure as e:
+                logger.error(f"Could not create index {model.document['name']} on {collection_name}: {str(e)}")
+
+
+async def _create_index(collection, model: IndexModel):
+    try:
+        await collection.create_indexes([model])
+    except OperationFailure as e:
+        if e.code not in _INDEX_CONFLICT_CODES:
+            raise
+        name = model.document["name"]
+        logger.info("Rebuilding index %s on %s with new options", name, collection.name)
+        await collection.drop_index(name)
+        await collection.create_indexes([model])
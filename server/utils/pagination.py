@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from fastapi import HTTPException
+
+# Newest first, with _id breaking ties between documents created in the same millisecond
+KEYSET_SORT = [("created_at", -1), ("_id", -1)]
+
+
+def encode_cursor(doc: dict) -> str:
+    """Opaque cursor pointing just past ``doc`` in ``KEYSET_SORT`` order."""
+    payload = {"t": doc["created_at"].isoformat(), "id": str(doc["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Return the ``(created_at, _id)`` position encoded in ``cursor``."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["t"]), ObjectId(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_query(query: dict, cursor: str = None) -> dict:
+    """Restrict ``query`` to the documents after ``cursor`` in ``KEYSET_SORT`` order.
+
+    Indexes ending in ``created_at: -1, _id: -1`` after the query's equality
+    fields let Mongo seek straight to the cursor, so every page costs the same.
+    """
+    if not cursor:
+        return query
+    created_at, _id = decode_cursor(cursor)
+    after = {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": _id}},
+    ]}
+    return {"$and": [query, after]} if query else after
+
+
+def encode_value_cursor(value: str) -> str:
+    """Opaque cursor for listings ordered by a single string key, such as a tag name."""
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+
+def decode_value_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode((cursor + "=" * (-len(cursor) % 4)).encode()).decode()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def next_cursor(docs: list, limit: int):
+    """Cursor for the page after ``docs``, or None when this was the last page."""
+    if len(docs) < limit:
+        return None
+    return encode_cursor(docs[-1])
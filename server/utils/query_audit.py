@@ -0,0 +1,149 @@
+"""Explain every query shape the app issues and flag collection scans and in-memory sorts.
+
+Run against a database (ideally a copy of production, since plans depend on
+the data) after a schema or query change::
+
+    python -m server.utils.query_audit --db personal_page_test
+
+The registry's indexes are applied first. The exit status is non-zero when
+any shape's winning plan contains a COLLSCAN or SORT stage that the shape
+does not explicitly allow.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from bson import ObjectId
+from server.utils.indexes import apply_indexes
+from server.utils.mongo_client import MongoDbClient
+from server.utils.pagination import KEYSET_SORT, keyset_query, encode_cursor
+
+_CURSOR = encode_cursor({"created_at": datetime(2024, 1, 1), "_id": ObjectId()})
+
+# One entry per distinct query shape, named after the code that issues it.
+# "command" is the explained command; "allow" lists bad stages a shape needs by
+# design (e.g. reading every document), which are only reported.
+QUERY_SHAPES = [
+    {"name": "blog.list_posts", "command": {
+        "find": "blog_posts", "filter": {}, "sort": dict(KEYSET_SORT), "limit": 10}},
+    {"name": "blog.list_posts?tag", "command": {
+        "find": "blog_posts", "filter": {"tags": "python"}, "sort": dict(KEYSET_SORT), "limit": 10}},
+    {"name": "blog.list_posts?published", "command": {
+        "find": "blog_posts", "filter": {"published": True}, "sort": dict(KEYSET_SORT), "limit": 10}},
+    {"name": "blog.list_posts?tag&published", "command": {
+        "find": "blog_posts", "filter": {"tags": "python", "published": True}, "sort": dict(KEYSET_SORT), "limit": 10}},
+    {"name": "blog.list_posts?cursor&tag&published", "command": {
+        "find": "blog_posts", "filter": keyset_query({"tags": "python", "published": True}, _CURSOR),
+        "sort": dict(KEYSET_SORT), "limit": 10}},
+    {"name": "blog.get_post", "command": {
+        "find": "blog_posts", "filter": {"_id": ObjectId()}, "limit": 1}},
+    {"name": "blog.search_posts", "allow": {"SORT"}, "command": {
+        # Ranking by text score sorts the matching posts, which the text index has already narrowed
+        "find": "blog_posts", "filter": {"$text": {"$search": "python async"}, "published": True},
+        "projection": {"score": {"$meta": "textScore"}}, "sort": {"score": {"$meta": "textScore"}}, "limit": 10}},
+    {"name": "blog.unique_tags?published&cursor", "command": {
+        "find": "tag_counts", "filter": {"published": {"$gt": 0}, "_id": {"$gt": "python"}},
+        "sort": {"_id": 1}, "limit": 100}},
+    {"name": "blog.unique_tags?published=false", "command": {
+        "find": "tag_counts", "filter": {"$expr": {"$gt": [{"$subtract": ["$total", "$published"]}, 0]}},
+        "sort": {"_id": 1}, "limit": 100}},
+    {"name": "admin.authenticate_admin", "command": {
+        "find": "admins", "filter": {"username": "admin"}, "limit": 1}},
+    {"name": "admin.dashboard.unread_messages", "command": {
+        "count": "contact_messages", "query": {"is_read": False}}},
+    {"name": "admin.dashboard.recent_messages", "command": {
+        "find": "contact_messages", "filter": {}, "sort": {"created_at": -1}, "limit": 4}},
+    {"name": "projects.get_projects", "allow": {"COLLSCAN"}, "command": {
+        "find": "projects", "filter": {}}},
+    {"name": "projects.get_projects?limit&view=card", "command": {
+        "find": "projects", "filter": {}, "projection": {"project_details.clientCode": 0, "project_details.serverCode": 0},
+        "sort": dict(KEYSET_SORT), "limit": 20}},
+    {"name": "projects.get_projects?cursor&published", "command": {
+        "find": "projects", "filter": keyset_query({"project_details.published": True}, _CURSOR),
+        "sort": dict(KEYSET_SORT), "limit": 20}},
+    {"name": "projects.get_project", "command": {
+        "find": "projects", "filter": {"_id": ObjectId()}, "limit": 1}},
+    {"name": "media_sweeper.referenced", "command": {
+        "distinct": "projects", "key": "images.image", "query": {"images.image": {"$in": ["/a.webp", "/b.webp"]}}}},
+    {"name": "media_sweeper.recently_referenced", "command": {
+        "distinct": "media", "key": "path",
+        "query": {"path": {"$in": ["/a.webp", "/b.webp"]}, "last_referenced": {"$gte": datetime(2024, 1, 1)}}}},
+    {"name": "media_service.release", "command": {
+        "findAndModify": "media", "query": {"path": "/a.webp"}, "update": {"$inc": {"refcount": -1}}}},
+    {"name": "ai_jobs.join_in_flight", "command": {
+        "findAndModify": "ai_jobs", "query": {"key": "k", "in_flight": True},
+        "update": {"$addToSet": {"socket_ids": "s"}}, "upsert": True}},
+    {"name": "ai_jobs.requeue", "command": {
+        "find": "ai_jobs", "filter": {"status": "queued"}, "projection": {"_id": 1}, "sort": {"created_at": 1}}},
+]
+
+BAD_STAGES = {"COLLSCAN", "SORT"}
+
+
+def plan_stages(plan) -> set:
+    """All stage names in an explain plan tree."""
+    stages = set()
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.add(plan["stage"])
+        for value in plan.values():
+            stages |= plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            stages |= plan_stages(value)
+    return stages
+
+
+def winning_plans(explain: dict) -> list:
+    """Winning plans of an explain result, including each stage of an aggregation."""
+    plans = []
+    if "queryPlanner" in explain:
+        plans.append(explain["queryPlanner"]["winningPlan"])
+    for stage in explain.get("stages", []):
+        cursor = stage.get("$cursor", {})
+        if "queryPlanner" in cursor:
+            plans.append(cursor["queryPlanner"]["winningPlan"])
+    for shard in explain.get("shards", {}).values():
+        plans.extend(winning_plans(shard))
+    return plans
+
+
+async def audit(db) -> list:
+    """Explain every shape and return one result per shape with the stages it uses."""
+    results = []
+    for shape in QUERY_SHAPES:
+        explain = await db.command("explain", shape["command"], verbosity="queryPlanner")
+        stages = set()
+        for plan in winning_plans(explain):
+            stages |= plan_stages(plan)
+        bad = stages & BAD_STAGES
+        results.append({
+            "name": shape["name"],
+            "stages": sorted(stages),
+            "bad_stages": sorted(bad),
+            "failed": bool(bad - shape.get("allow", set())),
+        })
+    return results
+
+
+async def main(db_name: str) -> int:
+    db = MongoDbClient(db_name).db
+    await apply_indexes(db)
+    results = await audit(db)
+
+    for result in results:
+        status = "FAIL" if result["failed"] else ("allow" if result["bad_stages"] else "ok")
+        print(f"{status:<5} {result['name']:<40} {' > '.join(result['stages'])}")
+
+    failed = [r["name"] for r in results if r["failed"]]
+    if failed:
+        print(f"\n{len(failed)} query shape(s) scan the collection or sort in memory: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="personal_page", help="Database to audit")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.db)))
@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from fastapi import Request, Response
+from server.utils.serialization import dump_trusted, dump_validated
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """In-process cache of serialized JSON responses for public GET routes.
+
+    Entries are keyed by path and query string, expire after ``ttl_seconds``
+    and are evicted least recently used first once their bodies exceed
+    ``max_bytes``. Each entry carries tags (e.g. ``"posts"``, ``"post:<id>"``)
+    and writes invalidate exactly the tags they affect. Every response has a
+    strong ETag, so a matching ``If-None-Match`` gets a 304 straight from the
+    cache. The TTL bounds how stale other worker processes can be.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._keys_by_tag = defaultdict(set)
+        # Bumped on invalidation so a load that raced a write is not stored; only
+        # invalidate() writes it, so reads for arbitrary ids add no entries
+        self._generations = {}
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+        self._invalidations = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", "60")),
+        )
+
+    async def respond(self, request: Request, response_type, tags, load, headers=None,
+                      trusted: bool = True) -> Response:
+        """Serve the cached response for ``request`` or build it with ``await load()``.
+
+        The loaded data is serialized as ``response_type``, like a route's
+        ``response_model``. By default that goes through the trusted-document
+        fast path, so the data must have been validated when it was written;
+        pass ``trusted=False`` to validate it with Pydantic instead.
+        ``headers``, if given, maps the loaded data to extra response headers,
+        which are cached with the body.
+        """
+        key = f"{request.url.path}?{'&'.join(sorted(request.url.query.split('&')))}"
+        entry = self._entries.get(key)
+        if entry is not None and entry["expires"] > time.monotonic():
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return self._response(request, entry, "HIT")
+
+        self._misses += 1
+        generations = [self._generations.get(tag, 0) for tag in tags]
+        data = await load()
+        body = dump_trusted(data, response_type) if trusted else dump_validated(data, response_type)
+        entry = {
+            "body": body,
+            "etag": f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            "headers": headers(data) if headers else {},
+            "tags": tuple(tags),
+            "expires": time.monotonic() + self.ttl_seconds,
+        }
+        if generations == [self._generations.get(tag, 0) for tag in tags]:
+            self._store(key, entry)
+        return self._response(request, entry, "MISS")
+
+    def _response(self, request: Request, entry: dict, status: str) -> Response:
+        headers = {"ETag": entry["etag"], "X-Cache": status, **entry["headers"]}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or entry["etag"] in
+                              [tag.strip() for tag in if_none_match.split(",")]):
+            self._not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+    def _store(self, key: str, entry: dict):
+        size = len(entry["body"])
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = entry
+        self._bytes += size
+        for tag in entry["tags"]:
+            self._keys_by_tag[tag].add(key)
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry["body"])
+        for tag in entry["tags"]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def invalidate(self, *tags: str):
+        """Drop every cached response carrying any of ``tags``."""
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            for key in list(self._keys_by_tag.get(tag, ())):
+                self._remove(key)
+                self._invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self._hits,
+            "misses": self._misses,
+            "not_modified": self._not_modified,
+            "invalidations": self._invalidations,
+            "hit_ratio": self._hits / lookups if lookups else 0.0,
+        }
+
+
+response_cache = ResponseCache.from_env()
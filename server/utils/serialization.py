@@ -0,0 +1,97 @@
+import types
+from functools import lru_cache
+from inspect import isclass
+from typing import Annotated, Union, get_args, get_origin
+import orjson
+from bson import ObjectId
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import PydanticUndefined
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _identity(value):
+    return value
+
+
+@lru_cache(maxsize=None)
+def _shaper(tp):
+    """Build a function that reshapes a trusted value of type ``tp`` into its JSON layout.
+
+    Models become dicts of their fields, keyed by alias and in declaration
+    order, with defaults for missing fields and extra keys dropped, which is
+    what validating and dumping them ``by_alias`` produces. A missing required
+    field raises ``ValueError``. Leaves are passed
+    through for orjson, which handles datetimes and, via ``_default``,
+    ObjectIds.
+    """
+    origin = get_origin(tp)
+    if origin is Annotated:
+        return _shaper(get_args(tp)[0])
+    if origin in (Union, types.UnionType):
+        args = [arg for arg in get_args(tp) if arg is not type(None)]
+        if len(args) != 1:
+            return _identity
+        inner = _shaper(args[0])
+        return inner if inner is _identity else (lambda value: None if value is None else inner(value))
+    if origin is list:
+        item = _shaper(get_args(tp)[0]) if get_args(tp) else _identity
+        if item is _identity:
+            return _identity
+        return lambda values: None if values is None else [item(value) for value in values]
+    if origin is dict:
+        item = _shaper(get_args(tp)[1]) if get_args(tp) else _identity
+        if item is _identity:
+            return _identity
+        return lambda values: None if values is None else {key: item(value) for key, value in values.items()}
+    if isclass(tp) and issubclass(tp, BaseModel):
+        fields = [
+            (field.alias or name, name, _shaper(field.annotation), field.get_default(call_default_factory=True))
+            for name, field in tp.model_fields.items()
+        ]
+
+        def shape_model(doc):
+            if doc is None:
+                return None
+            shaped = {}
+            for key, name, shape, default in fields:
+                if key in doc:
+                    shaped[key] = shape(doc[key])
+                elif name in doc:
+                    shaped[key] = shape(doc[name])
+                elif default is PydanticUndefined:
+                    raise ValueError(f"{tp.__name__}.{name} is required but missing from a trusted document")
+                else:
+                    shaped[key] = default
+            return shaped
+        return shape_model
+    return _identity
+
+
+def dump_trusted(data, response_type) -> bytes:
+    """Serialize documents read from our own collections as ``response_type`` JSON.
+
+    The documents were validated on the way in, so this skips Pydantic
+    validation: it only keeps the model's fields, converts ObjectIds and
+    datetimes and encodes with orjson. Use it only for data the app wrote.
+    """
+    return orjson.dumps(_shaper(response_type)(data), default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_type) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def dump_validated(data, response_type) -> bytes:
+    """Validate ``data`` as ``response_type`` and serialize it with Pydantic's JSON encoder.
+
+    For documents that were stored without validation, which need coercion
+    and required-field checks.
+    """
+    adapter = _adapter(response_type)
+    return adapter.dump_json(adapter.validate_python(data), by_alias=True)
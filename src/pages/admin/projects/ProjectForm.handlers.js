@@ -47,6 +47,7 @@ export const useProjectFormHandlers = (project, onSubmit, onCancel) => {
                 ? project.images.map((img) => ({
                       url: img.image,
                       description: img.description,
+                      variants: img.variants,
                       isNew: false,
                       isLoading: false,
                   }))
@@ -226,6 +227,7 @@ export const useProjectFormHandlers = (project, onSubmit, onCancel) => {
                     .map((img) => ({
                         image: img.url,
                         description: img.description,
+                        variants: img.variants,
                     })),
             };
 